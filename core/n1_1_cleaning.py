@@ -7,67 +7,107 @@ from datetime import date
 from typing import Optional
 
 import pandas as pd
+import numpy as np
 
 
 # ----------------------------------
-# Internal: canonical objective matcher (SSOT)
+# Internal: canonical objective taxonomy (SSOT)
 # ----------------------------------
-def _match_objective_token(token: str) -> Optional[str]:
-    """
-    Match a single token against the campaign objective taxonomy.
-    Returns canonical objective name or None if no match.
-    """
-    low = token.lower().strip()
-
+_OBJECTIVE_TOKENS = {
     # WhatsApp / Messaging
-    if low in {
+    "WhatsApp": {
         "wa", "wa messaging", "whatsapp", "whatsapp campaign",
         "messaging", "message"
-    }:
-        return "WhatsApp"
+    },
 
     # Traffic
-    if low in {"traf", "traffic", "trafic", "traff"}:
-        return "Traffic"
+    "Traffic": {"traf", "traffic", "trafic", "traff"},
 
     # Engagement
-    if low in {
+    "Engagement": {
         "eng", "engagement", "page engagement", "post engagement",
         "post engagement [visual]", "post engagement [video]",
         "post engagement m10", "post engagement m11", "post engagement m12",
         "eng maple market", "eng 11.11", "m2 others"
-    }:
-        return "Engagement"
+    },
 
     # Leads
-    if low in {
+    "Leads": {
         "lg", "leads", "lead gen", "lead gen m52-m55",
         "leadgen", "lead", "always on"
-    }:
-        return "Leads"
+    },
 
     # Brand Awareness
-    if low in {"brand awareness", "awareness", "ba"}:
-        return "Awareness"
+    "Awareness": {"brand awareness", "awareness", "ba"},
 
     # Conversion
-    if low in {"conversion", "conversions"}:
-        return "Conversion"
+    "Conversion": {"conversion", "conversions"},
 
     # Link Click
-    if low in {"link click", "link clicks"}:
-        return "Link Click"
+    "Link Click": {"link click", "link clicks"},
+}
+
+# Flat token -> objective lookup (built once at import)
+TOKEN_TO_OBJ = {
+    tok: obj
+    for obj, tokens in _OBJECTIVE_TOKENS.items()
+    for tok in tokens
+}
+
+# Month tags (M1, M2, M10, etc.)
+_MONTH_RE = re.compile(r"m\d+")
+
+# Whitespace runs (campaign name cleaning)
+_WS_RE = re.compile(r"\s+")
+
+# ----------------------------------
+# Internal: canonical objective matcher (SSOT)
+# ----------------------------------
+def _match_objective_token(token: str) -> Optional[str]:
+    """
+    Match a single token against the campaign objective taxonomy.
+    Returns canonical objective name or None if no match.
+    """
+    low = token.lower().strip()
+
+    hit = TOKEN_TO_OBJ.get(low)
+    if hit:
+        return hit
 
     # Video Views
     if "video views" in low:
         return "Video Views"
 
     # Month tags (M1, M2, M10, etc.) → preserve original
-    if re.fullmatch(r"m\d+.*", low):
+    if _MONTH_RE.match(low):
         return token.strip()
 
     return None
 
+def _match_objective_series(tokens: pd.Series) -> pd.Series:
+    """
+    Vectorized _match_objective_token over a column of tokens.
+    Same precedence as the scalar matcher; <NA> where nothing matches.
+    """
+    tokens = pd.Series(tokens, dtype="string").str.strip()
+    low = tokens.str.lower()
+
+    matched = low.map(TOKEN_TO_OBJ).astype("string")
+
+    # Video Views
+    matched = matched.mask(
+        matched.isna() & low.str.contains("video views", regex=False).fillna(False),
+        "Video Views",
+    )
+
+    # Month tags → preserve original
+    matched = matched.mask(
+        matched.isna() & low.str.match(_MONTH_RE.pattern).fillna(False),
+        tokens,
+    )
+
+    return matched
+
 # ----------------------------------
 # 1. Campaign name cleaning
 # ----------------------------------
@@ -86,10 +126,23 @@ def clean_campaign_name(x: Optional[str]) -> Optional[str]:
         return None
 
     x = str(x).strip()
-    x = re.sub(r"\s+", " ", x)
-    
+    x = _WS_RE.sub(" ", x)
+
     return x
 
+def clean_campaign_name_series(s: pd.Series) -> pd.Series:
+    """
+    Vectorized clean_campaign_name over a whole column.
+
+    Same rules as the scalar version, done in one pass
+    via the pandas .str accessor. Missing values stay <NA>.
+    """
+    return (
+        pd.Series(s, dtype="string")
+        .str.strip()
+        .str.replace(_WS_RE, " ", regex=True)
+    )
+
 # ----------------------------------
 # 2. Objective extraction 
 # ----------------------------------
@@ -109,6 +162,18 @@ def extract_objective(campaign_name: Optional[str]) -> Optional[str]:
     
     return parts[1]
 
+def extract_objective_series(s: pd.Series) -> pd.Series:
+    """
+    Vectorized extract_objective: second pipe segment, stripped.
+    """
+    return (
+        pd.Series(s, dtype="string")
+        .str.split("|", n=2)
+        .str[1]
+        .astype("string")
+        .str.strip()
+    )
+
 # -----------------------------------
 # 3. Objective normalization
 # -----------------------------------
@@ -125,6 +190,15 @@ def normalize_objective(obj: Optional[str]) -> Optional[str]:
     # fallback: title case original token
     return matched if matched else token.title()
 
+def normalize_objective_series(s: pd.Series) -> pd.Series:
+    """
+    Vectorized normalize_objective.
+    """
+    tokens = pd.Series(s, dtype="string").str.strip()
+
+    # fallback: title case original token
+    return _match_objective_series(tokens).fillna(tokens.str.title())
+
 # -------------------------------
 # 4. Objective extraction
 # -------------------------------
@@ -145,6 +219,20 @@ def extract_objective_dynamic(campaign_name: Optional[str]) -> Optional[str]:
     
     return None
 
+def extract_objective_dynamic_series(s: pd.Series) -> pd.Series:
+    """
+    Vectorized extract_objective_dynamic: first matching segment per row.
+    """
+    s = pd.Series(s, dtype="string")
+    parts = s.str.split("|", expand=True)
+
+    if parts.shape[1] == 0:
+        return pd.Series(pd.NA, index=s.index, dtype="string")
+
+    matched = parts.apply(_match_objective_series)
+
+    return matched.bfill(axis=1).iloc[:, 0].astype("string")
+
 # -----------------------------------------------
 # 5. Campaign activity status (semantic override)
 # -----------------------------------------------
@@ -188,4 +276,42 @@ def derive_campaign_activity_status(
         and (stop_date is None or stop_date >= today)
     )
 
-    return "ACTIVE" if is_active else "PASSIVE"
\ No newline at end of file
+    return "ACTIVE" if is_active else "PASSIVE"
+
+def _to_day(s: pd.Series) -> pd.Series:
+    """
+    Coerce to midnight-aligned, tz-naive datetime64 (date granularity).
+    """
+    s = pd.to_datetime(s, errors="coerce")
+    if s.dt.tz is not None:
+        s = s.dt.tz_localize(None)
+    return s.dt.normalize()
+
+def derive_campaign_activity_status_series(
+        effective_status: pd.Series,
+        date_start: pd.Series,
+        date_stop: pd.Series,
+        today: Optional[date] = None,
+) -> pd.Series:
+    """
+    Vectorized derive_campaign_activity_status.
+
+    Same rules as the scalar version. Missing start dates
+    compare False against today, so they fall to PASSIVE.
+    """
+    today_ts = pd.Timestamp(today or date.today())
+
+    status = pd.Series(effective_status, dtype="string").str.upper()
+    start = _to_day(date_start)
+    stop = _to_day(date_stop)
+
+    is_active = (
+        status.eq("ACTIVE").fillna(False).to_numpy(dtype=bool)
+        & (start <= today_ts).to_numpy()
+        & (stop.isna() | (stop >= today_ts)).to_numpy()
+    )
+
+    return pd.Series(
+        np.where(is_active, "ACTIVE", "PASSIVE"),
+        index=status.index,
+    )
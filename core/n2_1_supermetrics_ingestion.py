@@ -2,9 +2,157 @@
 
 from __future__ import annotations
 
-from typing import Union
+import csv
+import functools
+import hashlib
+import inspect
+import os
+from importlib.util import find_spec
+from typing import Callable, Union
 from pathlib import Path
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+# Rust-based Excel reader when installed (much faster than openpyxl's
+# XML parsing); None lets pandas pick its default engine
+EXCEL_ENGINE = "calamine" if find_spec("python_calamine") is not None else None
+
+# Supermetrics exports dates as ISO strings (YYYY-MM-DD[ HH:MM:SS])
+DATE_FORMAT = "ISO8601"
+
+CATEGORICAL_COLS = [
+    "campaign_status",
+    "campaign_objective",
+    "adset_status",
+    "ad_status",
+]
+
+# ==================================
+# Column mapping (Supermetrics -> canonical)
+# ==================================
+COLUMN_MAP = {
+#     "Date": "date",
+#     # dekat sini boleh tambah date_start, date_stop,  beza dgn campaign start stop.
+#     "Ad ID": "ad_id",
+#     "Campaign ID": "campaign_id",
+#     "Campaign Name": "campaign_name",
+#     "Ad set ID": "adset_id",
+#     "Ad name": "ad_name",
+#     "Impressions": "impressions",
+#     "Link clicks": "clicks_link",
+#     "Cost": "spend",
+#     "Actions": "actions",
+# }
+    # Core grain
+    "Date": "date",
+
+    # Campaign-level
+    "Campaign ID": "campaign_id",
+    "Campaign name": "campaign_name",
+    "Campaign start date": "campaign_start_date",
+    "Campaign end date": "campaign_end_date",
+    "Campaign status": "campaign_status",
+    "Campaign objective": "campaign_objective",
+
+    # ======================
+    # Ad set–level
+    # ======================
+    "Ad set ID": "adset_id",
+    "Ad set name": "adset_name",
+    "Ad set status": "adset_status",
+    "Ad set start time": "adset_start_time",
+    "Ad set end time": "adset_end_time",
+
+    # Ad-level
+    "Ad ID": "ad_id",
+    "Ad name": "ad_name",
+    "Creative name": "creative_name",
+    "Ad status": "ad_status",
+
+    # Metrics (authoritative)
+    "Impressions": "impressions",
+    "Cost": "spend",
+
+    "Link clicks": "clicks",
+    "Clicks (all)": "clicks_all",
+
+    "Actions": "actions",
+    "Cost per action (CPA)": "cpa",
+
+    # Optional diagnostics (kept raw, not used downstream yet)
+    "CPM (cost per 1000 impressions)": "cpm",
+    "Cost per 1000 people reached": "cost_per_1000_reach",
+    "CTR (link click-through rate)": "ctr_link_reported",
+    "CTR (all)": "ctr_all_reported",
+    "CPC (cost per link click)": "cpc_link",
+    "CPC (all)": "cpc_all",
+
+}
+
+# Declared Arrow types for the CSV reader (canonical names; no inference).
+# IDs as strings so long numeric IDs are never parsed as float.
+# Date columns stay strings -> parsed below with DATE_FORMAT.
+CSV_SCHEMA = {
+    "campaign_id": pa.string(),
+    "adset_id": pa.string(),
+    "ad_id": pa.string(),
+    "impressions": pa.int64(),
+    "spend": pa.float64(),
+    "clicks": pa.int64(),
+    "clicks_all": pa.int64(),
+    "actions": pa.int64(),
+    "cpa": pa.float64(),
+    "cpm": pa.float64(),
+    "cost_per_1000_reach": pa.float64(),
+    "ctr_link_reported": pa.float64(),
+    "ctr_all_reported": pa.float64(),
+    "cpc_link": pa.float64(),
+    "cpc_all": pa.float64(),
+}
+
+def _read_csv_arrow(path: Path) -> pd.DataFrame:
+    """
+    Multi-threaded Arrow CSV parse of the mapped columns only,
+    with declared types for IDs / metrics.
+    """
+    # header peek: raw names may carry stray whitespace
+    # (first line only, no pandas parser; utf-8-sig drops an Excel BOM)
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), [])
+    usecols = [c for c in header if c.strip() in COLUMN_MAP]
+
+    read_options = pacsv.ReadOptions(use_threads=True, block_size=8 << 20)
+    declared = {
+        c: CSV_SCHEMA[COLUMN_MAP[c.strip()]]
+        for c in usecols
+        if COLUMN_MAP[c.strip()] in CSV_SCHEMA
+    }
+
+    try:
+        table = pacsv.read_csv(
+            path,
+            read_options=read_options,
+            convert_options=pacsv.ConvertOptions(
+                include_columns=usecols,
+                column_types=declared,
+            ),
+        )
+    except pa.ArrowInvalid:
+        # a metric holds non-numeric junk: parse with inference instead and
+        # let the pd.to_numeric(errors="coerce") pass below clean it up
+        table = pacsv.read_csv(
+            path,
+            read_options=read_options,
+            convert_options=pacsv.ConvertOptions(
+                include_columns=usecols,
+                column_types={
+                    c: t for c, t in declared.items() if pa.types.is_string(t)
+                },
+            ),
+        )
+
+    return table.to_pandas(split_blocks=True, self_destruct=True)
 
 # ==================================================
 # Supermetrics ingestion (raw, no logic)
@@ -28,78 +176,22 @@ def load_supermetrics_export(
     # ================================
     # Load file
     # ================================
+    # Projection pushdown: only parse the mapped columns
     if path.suffix.lower() == ".csv":
-        df = pd.read_csv(path)
+        # Arrow CSV reader directly: declared types, no per-column inference
+        df = _read_csv_arrow(path)
     elif path.suffix.lower() in {".xlsx", ".xls"}:
-        df = pd.read_excel(path)
+        df = pd.read_excel(
+            path,
+            engine=EXCEL_ENGINE,
+            usecols=lambda c: str(c).strip() in COLUMN_MAP,
+        )
     else:
         raise ValueError("Unsupported file type. Use CSV or Excel.")
     
     # Trim headers defensively
     df.columns = df.columns.str.strip()
     
-    # ==================================
-    # Column mapping (Supermetrics -> canonical)
-    # ==================================
-    COLUMN_MAP = {
-    #     "Date": "date",
-    #     # dekat sini boleh tambah date_start, date_stop,  beza dgn campaign start stop.
-    #     "Ad ID": "ad_id",
-    #     "Campaign ID": "campaign_id",
-    #     "Campaign Name": "campaign_name",
-    #     "Ad set ID": "adset_id",
-    #     "Ad name": "ad_name",
-    #     "Impressions": "impressions",
-    #     "Link clicks": "clicks_link",
-    #     "Cost": "spend",
-    #     "Actions": "actions",
-    # }
-        # Core grain
-        "Date": "date",
-
-        # Campaign-level
-        "Campaign ID": "campaign_id",
-        "Campaign name": "campaign_name",
-        "Campaign start date": "campaign_start_date",
-        "Campaign end date": "campaign_end_date",
-        "Campaign status": "campaign_status",
-        "Campaign objective": "campaign_objective",
-
-        # ======================
-        # Ad set–level
-        # ======================
-        "Ad set ID": "adset_id",
-        "Ad set name": "adset_name",
-        "Ad set status": "adset_status",
-        "Ad set start time": "adset_start_time",
-        "Ad set end time": "adset_end_time",
-
-        # Ad-level
-        "Ad ID": "ad_id",
-        "Ad name": "ad_name",
-        "Creative name": "creative_name",
-        "Ad status": "ad_status",
-
-        # Metrics (authoritative)
-        "Impressions": "impressions",
-        "Cost": "spend",
-
-        "Link clicks": "clicks",
-        "Clicks (all)": "clicks_all",
-
-        "Actions": "actions",
-        "Cost per action (CPA)": "cpa",
-
-        # Optional diagnostics (kept raw, not used downstream yet)
-        "CPM (cost per 1000 impressions)": "cpm",
-        "Cost per 1000 people reached": "cost_per_1000_reach",
-        "CTR (link click-through rate)": "ctr_link_reported",
-        "CTR (all)": "ctr_all_reported",
-        "CPC (cost per link click)": "cpc_link",
-        "CPC (all)": "cpc_all",
-
-    }
-    
     # ===============================
     # Validate presence (FAIL FAST)
     # ===============================
@@ -115,22 +207,31 @@ def load_supermetrics_export(
     # ------------------------
     # Minimal type coercion (safe)
     # ------------------------
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-
-    for col in ["campaign_start_date", "campaign_end_date"]:
-        df[col] = pd.to_datetime(df[col], errors="coerce")
-    
-    for col in ["adset_start_time", "adset_end_time"]:
-        df[col] = pd.to_datetime(df[col], errors="coerce")
+    # Explicit format skips per-value dateutil inference
+    for col in [
+        "date",
+        "campaign_start_date",
+        "campaign_end_date",
+        "adset_start_time",
+        "adset_end_time",
+    ]:
+        df[col] = pd.to_datetime(
+            df[col],
+            errors="coerce",
+            format=DATE_FORMAT,
+            cache=True,
+        )
     
     # Fix numeric IDs sometimes exported as floats
     for col in ["campaign_id", "adset_id","ad_id"]:
     #for col in ["ad_id", "campaign_id", "adset_id"]:
-        df[col] = (
-            df[col]
-            .astype(str)
-            .str.replace(r"\.0$", "", regex=True)
-        )
+        # Integer-aware cast (no regex pass)
+        if pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype("Int64").astype("string")
+        elif pd.api.types.is_integer_dtype(df[col]):
+            df[col] = df[col].astype("string")
+        else:
+            df[col] = df[col].astype("string").str.removesuffix(".0")
 
     # Numeric metrics (NO derivation)
     numeric_cols = [
@@ -153,6 +254,102 @@ def load_supermetrics_export(
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors="coerce")
 
+    # Low-cardinality labels -> category (int codes, less memory)
+    for col in CATEGORICAL_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    # campaign_id repeats on every ad x day row: dictionary-encode it too,
+    # so every downstream groupby / factorize works on int codes
+    df["campaign_id"] = df["campaign_id"].astype("category")
+
     return df
 
 
+
+
+# ==================================================
+# In-process memoization (long-running scheduler processes)
+# ==================================================
+@functools.lru_cache(maxsize=8)
+def _load_supermetrics_export_memo(path: Path, mtime_ns: int, size: int) -> pd.DataFrame:
+    return load_supermetrics_export(path)
+
+def load_supermetrics_export_memo(path: Union[str, Path]) -> pd.DataFrame:
+    """
+    load_supermetrics_export, cached per (path, mtime, size) for the life
+    of the process: a repeat call on an unchanged file is a dict lookup.
+
+    The returned frame is shared between calls -> treat it as read-only.
+    """
+    path = Path(path).resolve()
+    st = path.stat()
+    return _load_supermetrics_export_memo(path, st.st_mtime_ns, st.st_size)
+
+# ==================================================
+# Persistent memoization (re-runs on an unchanged export)
+# ==================================================
+_FINGERPRINT_BYTES = 1 << 20  # 1 MiB from each end of the file
+
+def file_fingerprint(path: Path) -> str:
+    """
+    Cheap content identity for an export file:
+    (resolved path, mtime, size) + BLAKE2b over the first and last 1 MiB.
+    """
+    st = path.stat()
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{path.resolve()}|{st.st_mtime_ns}|{st.st_size}".encode())
+
+    with open(path, "rb") as f:
+        h.update(f.read(_FINGERPRINT_BYTES))
+        if st.st_size > 2 * _FINGERPRINT_BYTES:
+            f.seek(-_FINGERPRINT_BYTES, 2)
+            h.update(f.read())
+
+    return h.hexdigest()
+
+def code_fingerprint(fn: Callable) -> str:
+    """
+    Hash of the source file defining fn (covers its private helpers and
+    module constants too).
+    """
+    return hashlib.blake2b(
+        Path(inspect.getfile(fn)).read_bytes(), digest_size=16
+    ).hexdigest()
+
+def disk_memoize(cache_dir: Union[str, Path]) -> Callable:
+    """
+    Cache a path -> DataFrame loader as Parquet under cache_dir.
+
+    Key = loader name + loader module source + input file fingerprint, so
+    an edited loader, helper or constant (COLUMN_MAP, CSV_SCHEMA, ...) or a
+    new export all miss. A hit skips CSV / Excel parsing entirely.
+    """
+    cache_dir = Path(cache_dir)
+
+    def decorator(fn: Callable[[Path], pd.DataFrame]) -> Callable[[Path], pd.DataFrame]:
+        code_hash = code_fingerprint(fn)[:16]
+
+        @functools.wraps(fn)
+        def wrapper(path: Union[str, Path]) -> pd.DataFrame:
+            path = Path(path)
+            cached = cache_dir / f"{fn.__name__}-{code_hash}-{file_fingerprint(path)}.parquet"
+
+            if cached.exists():
+                return pd.read_parquet(cached)
+
+            df = fn(path)
+
+            # temp file + atomic rename: a crash mid-write never leaves a
+            # truncated file under the cache name
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = cached.with_name(f"{cached.name}.{os.getpid()}.tmp")
+            df.to_parquet(tmp, index=False, compression="zstd")
+            os.replace(tmp, cached)
+
+            return df
+
+        return wrapper
+
+    return decorator
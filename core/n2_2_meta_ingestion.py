@@ -2,40 +2,116 @@
 
 from __future__ import annotations
 
-import requests
+import asyncio
+import re
+from functools import lru_cache
+
+import httpx
 import pandas as pd
-from typing import Dict, List, Any, Optional
-from tqdm import tqdm
+from typing import AsyncIterator, Dict, List, Any, Optional
+from tqdm.asyncio import tqdm_asyncio
+
+# Concurrent Graph API connections (I/O bound, event loop multiplexes them)
+MAX_CONNECTIONS = 64
+
+# Graph API error codes worth retrying: unknown / service errors (1, 2)
+# and rate limits (4, 17, 32, 341, 613). Anything else (e.g. 190 invalid
+# token, 10 / 200 permissions) fails the same way on every attempt.
+RETRYABLE_ERROR_CODES = frozenset({1, 2, 4, 17, 32, 341, 613})
+
+# Row order of the fact table, independent of request completion order
+FACT_SORT_KEYS = ["campaign_id", "date", "adset_id", "ad_id"]
 
 # ----------------------------------
-# Internal: Defensive Meta API request layer (retry, no sleep)
+# Internal: Defensive Meta API request layer (retry + backoff)
 # ----------------------------------
-def _fb_get(url: str, retries: int = 5) -> Dict[str, Any]:
+class MetaRequestError(RuntimeError):
+    """A Graph API GET still failing after all retries."""
+
+async def _fb_get(
+        client: httpx.AsyncClient,
+        url: str,
+        limit: asyncio.Semaphore,
+        retries: int = 5,
+) -> Dict[str, Any]:
     """
     Robust GET wrapper for Meta Graph API.
     Handles:
     - silent empty responses
     - HTML errors
     - non-JSON payloads
-    - retry with backoff
-    - no sleep
+    - Graph API error JSON (rate limits, transient errors)
+    - retry with backoff (asyncio.sleep: other requests keep running)
+
+    Only transient failures are retried: network errors, HTTP 5xx / 429
+    and RETRYABLE_ERROR_CODES. A permanent Graph API error (invalid
+    token, missing permission, bad request) raises at once.
+
+    `limit` caps requests in flight, so queued coroutines wait here
+    instead of timing out on the connection pool.
+
+    Raises MetaRequestError when every attempt fails: a missing page
+    must not look like an empty one.
     """
-    for _ in range(retries):
+    endpoint = url.split("?", 1)[0]  # no access token in messages
+    last_error = "no attempt made"
+
+    for attempt in range(retries):
+        if attempt:
+            await asyncio.sleep(2 ** (attempt - 1))
+
         try:
-            r = requests.get(url, timeout=30)
+            async with limit:
+                r = await client.get(url)
+
+            transient = r.status_code >= 500 or r.status_code == 429
 
             if not r.text:
-                continue
+                last_error = f"empty response (HTTP {r.status_code})"
+                if transient:
+                    continue
+                raise MetaRequestError(f"GET {endpoint} failed: {last_error}")
 
             if not r.headers.get("Content-Type", "").startswith("application/json"):
-                continue
+                last_error = f"non-JSON response (HTTP {r.status_code})"
+                if transient:
+                    continue
+                raise MetaRequestError(f"GET {endpoint} failed: {last_error}")
+
+            data = r.json()
+
+            if "error" in data:
+                err = data["error"]
+                last_error = f"Graph API error {err.get('code')}: {err.get('message')}"
+                if (
+                    transient
+                    or err.get("code") in RETRYABLE_ERROR_CODES
+                    or err.get("is_transient")
+                ):
+                    continue
+                raise MetaRequestError(f"GET {endpoint} failed: {last_error}")
+
+            return data
+
+        except (httpx.HTTPError, ValueError) as e:
+            last_error = f"{type(e).__name__}: {e}"
+            continue
 
-            return r.json()
+    raise MetaRequestError(f"GET {endpoint} failed after {retries} attempts: {last_error}")
 
-        except Exception:
-            continue
-    
-    return {}
+async def _iter_paginated(
+        client: httpx.AsyncClient,
+        url: Optional[str],
+        limit: asyncio.Semaphore,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Follow Graph API paging.next links, yielding items page by page.
+    """
+    while url:
+        data = await _fb_get(client, url, limit)
+        for item in data.get("data", []):
+            yield item
+        url = data.get("paging", {}).get("next")
 
 # =======================================================
 # MARK: 5- Normalize Insight Structure (exact result type + value)
@@ -54,16 +130,35 @@ def _parse_result(block: Any) -> tuple[Optional[str], Optional[float]]:
     :rtype: tuple[str | None, float | None]
     """
 
-    if not isinstance(block, list) or not block:
+    if type(block) is not list or not block:
         return None, None
     
     item = block[0]
+
+    # Happy path: fully-populated block, no .get() chain
+    try:
+        return item["indicator"], item["values"][0]["value"]
+    except (KeyError, IndexError, TypeError):
+        pass
+
     rtype = item.get("indicator")
     values = item.get("values", [])
 
     rval = values[0].get("value") if values else None
     return rtype, rval
 
+_EMPTY_INSIGHT = (None, None, None, None)
+
+def _parse_insight(ins: Dict[str, Any]) -> tuple:
+    """
+    Parse one insight row into
+    (result_type, result_value, cpr_type, cpr_value).
+    """
+    return (
+        *_parse_result(ins.get("results")),
+        *_parse_result(ins.get("cost_per_result")),
+    )
+
 # ====================================================
 # MARK:8.1- Normalize ad_result_type & campaign_result_type
 # ====================================================
@@ -117,58 +212,134 @@ CATEGORY_MAP = {
     "unknown": "Unknown",
 }
 
+# Output columns of the daily fact table (column-wise accumulation order)
+FACT_COLUMNS = [
+    "date",
+
+    # Campaign
+    "campaign_id",
+    "campaign_name",
+    "campaign_objective",
+    "campaign_effective_status",
+    "campaign_date_start",
+    "campaign_date_stop",
+    "campaign_result_type",
+    "campaign_result_value",
+    "campaign_cpr_type",
+    "campaign_cpr_value",
+
+    # Adset
+    "adset_id",
+    "adset_name",
+    "adset_effective_status",
+    "adset_result_type",
+    "adset_result_value",
+    "adset_cpr_type",
+    "adset_cpr_value",
+
+    # Ad
+    "ad_id",
+    "ad_name",
+    "ad_status",
+    "creative_title",
+    "ad_result_type",
+    "ad_result_value",
+    "ad_cpr_type",
+    "ad_cpr_value",
+]
+
+# Repeated low-cardinality labels stored as category post-ingest
+CATEGORICAL_COLS = [
+    "campaign_objective",
+    "campaign_effective_status",
+    "adset_effective_status",
+    "ad_status",
+    "campaign_result_type",
+    "adset_result_type",
+    "ad_result_type",
+    "campaign_cpr_type",
+    "adset_cpr_type",
+    "ad_cpr_type",
+]
+
+# Canonical name -> substring, in priority order (first hit wins)
+_RESULT_PATTERNS = {
+    "post_engagement": "post_engagement",
+    "like": "actions:like",
+    "profile_visit": "profile_visit",
+    "page_visit": "page_visit",
+    "video_thruplay": "video_thruplay",
+
+    "reach": "reach",
+    "ad_recall_lift": "ad_recall",
+
+    "link_click": "link_click",
+    "landing_page_view": "landing_page_view",
+
+    "messaging_conversation_started": "messaging_conversation_started",
+
+    "lead": "fb_pixel_lead",
+    "conversion_lead": "conversion_lead",
+    "submit_application": "submit_application",
+
+    "purchase": "purchase",
+    "initiate_checkout": "initiate_checkout",
+    "view_content": "view_content",
+
+    "custom_event": "custom",
+}
+
 def normalize_result_type(x: Optional[str]) -> str:
     if not x:
         return "unknown"
-    
-    low = str(x).lower()
-
-    if "post_engagement" in low:
-        return "post_engagement"
-    if "actions:like" in low:
-        return "like"
-    if "profile_visit" in low:
-        return "profile_visit"
-    if "page_visit" in low:
-        return "page_visit"
-    if "video_thruplay" in low:
-        return "video_thruplay"
-    
-    if "reach" in low:
-        return "reach"
-    if "ad_recall" in low:
-        return "ad_recall_lift"
-    
-    if "link_click" in low:
-        return "link_click"
-    if "landing_page_view" in low:
-        return "landing_page_view"
-    
-    if "messaging_conversation_started" in low:
-        return "messaging_conversation_started"
-    
-    if "fb_pixel_lead" in low:
-        return "lead"
-    if "conversion_lead" in low:
-        return "conversion_lead"
-    if "submit_application" in low:
-        return "submit_application"
-    
-    if "purchase" in low:
-        return "purchase"
-    if "initiate_checkout" in low:
-        return "initiate_checkout"
-    if "view_content" in low:
-        return "view_content"
-    
-    if "custom" in low:
-        return "custom_event"
-    
+
+    return _normalize_result_type_lower(str(x).lower())
+
+@lru_cache(maxsize=None)
+def _normalize_result_type_lower(low: str) -> str:
+    # Indicator strings are very low-cardinality, so each distinct
+    # value is scanned once and served from the cache afterwards.
+    for name, pat in _RESULT_PATTERNS.items():
+        if pat in low:
+            return name
+
     return "unknown"
 
 def categorize_result_type(normalized: str) -> str:
     return CATEGORY_MAP.get(normalized, "Unknown")
 
+# ---------------------------------
+# Vectorized result type normalization
+# ---------------------------------
+# Anchored alternation: branches are tried in order, so the first
+# pattern found anywhere in the string wins (same as normalize_result_type).
+_RESULT_RE = re.compile(
+    "^(?:" + "|".join(
+        f".*?(?P<{name}>{re.escape(pat)})"
+        for name, pat in _RESULT_PATTERNS.items()
+    ) + ")",
+    re.DOTALL,
+)
+
+def normalize_result_type_series(s: pd.Series) -> pd.Series:
+    """
+    Vectorized normalize_result_type via one compiled regex.
+    """
+    low = pd.Series(s, dtype="string").str.lower()
+    hits = low.str.extract(_RESULT_RE).notna()
+
+    return (
+        hits.idxmax(axis=1)
+        .where(hits.any(axis=1), "unknown")
+        .astype(object)
+    )
+
+def categorize_result_type_series(normalized: pd.Series) -> pd.Series:
+    """
+    Vectorized categorize_result_type (pure dict map).
+    """
+    return normalized.map(CATEGORY_MAP).fillna("Unknown")
+
 
 
 # ------------------------------------------
@@ -180,6 +351,24 @@ def fetch_meta_daily_fact_table(
         ad_account_id: str,
         date_since: str,
         date_until: str,
+) -> pd.DataFrame:
+    """
+    Sync facade over fetch_meta_daily_fact_table_async.
+    """
+    return asyncio.run(
+        fetch_meta_daily_fact_table_async(
+            access_token=access_token,
+            ad_account_id=ad_account_id,
+            date_since=date_since,
+            date_until=date_until,
+        )
+    )
+
+async def fetch_meta_daily_fact_table_async(
+        access_token: str,
+        ad_account_id: str,
+        date_since: str,
+        date_until: str,
 ) -> pd.DataFrame:
     """
     Fetch DAILY ad-level semantic facts from Meta.
@@ -196,181 +385,182 @@ def fetch_meta_daily_fact_table(
         - campaign date_start / date_stop
     """
 
-    # -------------------------------------
-    # 1. Fetch campaigns (semantic truth)
-    # // 2. Hierarchy fetchers
-    # -------------------------------------
-    campaigns: List[Dict[str, Any]] = []
-    url = (
-        f"https://graph.facebook.com/v24.0/{ad_account_id}/campaigns"
-        f"?fields=id,name,objective,effective_status,start_time,stop_time"
-        f"daily_budget,lifetime_budget,budget_remaining,"
-        f"insights.time_range({{'since':'{date_since}','until':'{date_until}'}})"
-        #f"&effective_status=['ACTIVE','PAUSED','ARCHIVED']"
-        f"{{date_start,date_stop,impressions,reach,spend,results,cost_per_result}}"
-        f"&limit=200"
-        f"&access_token={access_token}"
-    )
-
-    while url:
-        data = _fb_get(url)
-        campaigns.extend(data.get("data", []))
-        url = data.get("paging", {}).get("next")
-    
-    campaign_map = {c["id"]: c for c in campaigns}
-
-    # ======================================
-    ## MARK: 2- Get All Adsets per Campaign 
-    # ======================================
-    
-    # ----------------------------------
-    # 2. Fetch ads (adset? identity?)
-    # ----------------------------------
-
-    adsets: List[Dict[str, Any]] = []
-
-    #def get_adsets(access_token: str, campaign_id: str) -> List[Dict[str, Any]]:
-    #    adsets = []
-
-    #for c in campaigns:
-    for c in tqdm(campaigns, desc="Campaigns", unit="campaign"):    
+    # One pooled client shared by all hierarchy fetchers, closed even on
+    # error. The semaphore keeps in-flight requests within the pool, and
+    # pool=None stops a queued request from timing out while it waits.
+    async with httpx.AsyncClient(
+        timeout=httpx.Timeout(30, pool=None),
+        limits=httpx.Limits(max_connections=MAX_CONNECTIONS),
+    ) as client:
+        limit = asyncio.Semaphore(MAX_CONNECTIONS)
+
+        # -------------------------------------
+        # 1. Fetch campaigns (semantic truth)
+        # // 2. Hierarchy fetchers
+        # -------------------------------------
         url = (
-            f"https://graph.facebook.com/v24.0/{c['id']}/adsets"
-            f"?fields=id,name,status,effective_status,daily_budget,lifetime_budget,"
-            f"optimization_goal,billing_event,start_time,end_time,"
+            f"https://graph.facebook.com/v24.0/{ad_account_id}/campaigns"
+            f"?fields=id,name,objective,effective_status,start_time,stop_time"
+            f"daily_budget,lifetime_budget,budget_remaining,"
             f"insights.time_range({{'since':'{date_since}','until':'{date_until}'}})"
+            #f"&effective_status=['ACTIVE','PAUSED','ARCHIVED']"
             f"{{date_start,date_stop,impressions,reach,spend,results,cost_per_result}}"
             f"&limit=200"
             f"&access_token={access_token}"
         )
 
-        while url:
-            data = _fb_get(url)
-            #adsets.extend(data.get("data", []))
-            for a in data.get("data", []):
-                a["campaign_id"] = c["id"]
-                adsets.append(a)
-            url = data.get("paging", {}).get("next")
-
-    adset_map = {a["id"]: a for a in adsets}
+        campaign_map: Dict[str, Dict[str, Any]] = {}
 
-    # -----------------------------
-    # 3. Fetch Daily Ads , insights per ad?
-    # ------------------------------
+        # Date-indexed, already-parsed parent insights, built once per parent
+        # (not re-parsed for every ad-day that shares the parent)
+        campaign_ins_by_date: Dict[str, Dict[str, tuple]] = {}
 
-    # ======================================
-    ## MARK: 3- Get All Ads per Adset
-    # ======================================
-    ads: List[Dict[str, Any]] = []
+        async for c in _iter_paginated(client, url, limit):
+            campaign_map[c["id"]] = c
+            campaign_ins_by_date[c["id"]] = {
+                i["date_start"]: _parse_insight(i)
+                for i in c.pop("insights", {}).get("data", [])
+            }
 
-    #for a in adsets:
-    for a in tqdm(adsets, desc="Adsets", unit="adset"):
-        url = (
-            f"https://graph.facebook.com/v24.0/{a['id']}/ads"
-            f"?fields=id,name,status,effective_status,creative{{title}},"
-            f"insights.time_range({{'since':'{date_since}','until':'{date_until}'}})"
-            f"&time_increment=1"
-            f"{{date_start,date_stop,impressions,reach,spend,results,cost_per_result}}"
-            f"&limit=200"
-            f"&access_token={access_token}"
+        # ======================================
+        ## MARK: 2- Get All Adsets per Campaign 
+        # ======================================
+    
+        # ----------------------------------
+        # 2. Fetch ads (adset? identity?)
+        # ----------------------------------
+        adset_map: Dict[str, Dict[str, Any]] = {}
+        adset_ins_by_date: Dict[str, Dict[str, tuple]] = {}
+
+        async def _fetch_adsets(c: Dict[str, Any]) -> None:
+            url = (
+                f"https://graph.facebook.com/v24.0/{c['id']}/adsets"
+                f"?fields=id,name,status,effective_status,daily_budget,lifetime_budget,"
+                f"optimization_goal,billing_event,start_time,end_time,"
+                f"insights.time_range({{'since':'{date_since}','until':'{date_until}'}})"
+                f"{{date_start,date_stop,impressions,reach,spend,results,cost_per_result}}"
+                f"&limit=200"
+                f"&access_token={access_token}"
+            )
+
+            async for a in _iter_paginated(client, url, limit):
+                a["campaign_id"] = c["id"]
+                adset_map[a["id"]] = a
+                adset_ins_by_date[a["id"]] = {
+                    i["date_start"]: _parse_insight(i)
+                    for i in a.pop("insights", {}).get("data", [])
+                }
+
+        # Sibling campaigns fetched concurrently
+        await tqdm_asyncio.gather(
+            *(_fetch_adsets(c) for c in campaign_map.values()),
+            desc="Campaigns", unit="campaign",
         )
 
-        while url:
-            data = _fb_get(url)
-            for ad in data.get("data", []):
-                ad["adset_id"] = a["id"]
-                ad["campaign_id"] = a["campaign_id"]
-                ads.append(ad)
-            url = data.get("paging", {}).get("next")
-
-    # ==============================================================
-    # MARK: 4- Get Insights (Data) for Each Object (Campaign, Adset, Ad)
-    # ==============================================================
+        # ==============================================================
+        # MARK: 4- Get Insights (Data) for Each Object (Campaign, Adset, Ad)
+        # ==============================================================
 
 
     
-    # ==============================================================
-    # MARK: 6- Build Final DataFrame (Campaign -> adset -> ad)
-    # ==============================================================
-
-    # ------------------------------------
-    # 4. Build DAILY rows (aligned by date)
-    # ------------------------------------
-    rows: List[Dict[str, Any]] = []
-
-    #for ad in ads:
-    for ad in tqdm(ads, desc="Ads", unit="ad"):
-        ad_insights = ad.get("insights", {}).get("data", [])
-
-        aset = adset_map.get(ad["adset_id"])
-        camp = campaign_map.get(ad["campaign_id"])
-
-        aset_ins_map = {
-            i["date_start"]: i for i in aset.get("insights", {}).get("data", [])
-        } if aset else {}
-
-        camp_ins_map = {
-            i["date_start"]: i for i in camp.get("insights", {}).get("data", [])
-        } if camp else {}
+        # ==============================================================
+        # MARK: 6- Build Final DataFrame (Campaign -> adset -> ad)
+        # ==============================================================
 
-        for ad_ins in ad_insights:
-            d = ad_ins.get("date_start")
+        # ------------------------------------
+        # 4. Build DAILY rows (aligned by date)
+        # ------------------------------------
+        cols: Dict[str, List[Any]] = {name: [] for name in FACT_COLUMNS}
 
-            c_ins = camp_ins_map.get(d, {})
-            a_ins = aset_ins_map.get(d, {})
+        def _append_ad_rows(ad: Dict[str, Any], aset: Dict[str, Any]) -> None:
+            camp = campaign_map.get(aset["campaign_id"])
 
-            c_type, c_val = _parse_result(c_ins.get("results"))
-            c_cpr_type, c_cpr_val = _parse_result(c_ins.get("cost_per_result"))
+            aset_ins_map = adset_ins_by_date.get(aset["id"], {})
+            camp_ins_map = campaign_ins_by_date.get(aset["campaign_id"], {})
 
-            as_type, as_val = _parse_result(a_ins.get("results"))
-            as_cpr_type, as_cpr_val = _parse_result(a_ins.get("cost_per_result"))
+            for ad_ins in ad.get("insights", {}).get("data", []):
+                d = ad_ins.get("date_start")
 
-            ad_type, ad_val = _parse_result(ad_ins.get("results"))
-            ad_cpr_type, ad_cpr_val = _parse_result(ad_ins.get("cost_per_result"))
+                c_type, c_val, c_cpr_type, c_cpr_val = camp_ins_map.get(d, _EMPTY_INSIGHT)
+                as_type, as_val, as_cpr_type, as_cpr_val = aset_ins_map.get(d, _EMPTY_INSIGHT)
+                ad_type, ad_val, ad_cpr_type, ad_cpr_val = _parse_insight(ad_ins)
 
-            rows.append({
-                "date": ad_ins.get("date_stop"),
+                cols["date"].append(ad_ins.get("date_stop"))
 
                 # Campaign
-                "campaign_id": camp.get("id"),
-                "campaign_name": camp.get("name"),
-                "campaign_objective": camp.get("objective"),
-                "campaign_effective_status": camp.get("effective_status"),
-                "campaign_date_start": camp.get("start_time"),
-                "campaign_date_stop": camp.get("stop_time"),
-                "campaign_result_type": c_type,
-                "campaign_result_value": c_val,
-                "campaign_cpr_type": c_cpr_type,
-                "campaign_cpr_value": c_cpr_val,
+                cols["campaign_id"].append(camp.get("id"))
+                cols["campaign_name"].append(camp.get("name"))
+                cols["campaign_objective"].append(camp.get("objective"))
+                cols["campaign_effective_status"].append(camp.get("effective_status"))
+                cols["campaign_date_start"].append(camp.get("start_time"))
+                cols["campaign_date_stop"].append(camp.get("stop_time"))
+                cols["campaign_result_type"].append(c_type)
+                cols["campaign_result_value"].append(c_val)
+                cols["campaign_cpr_type"].append(c_cpr_type)
+                cols["campaign_cpr_value"].append(c_cpr_val)
 
                 # Adset
-                "adset_id": aset.get("id"),
-                "adset_name": aset.get("name"),
-                "adset_effective_status": aset.get("effective_status"),
-                "adset_result_type": as_type,
-                "adset_result_value": as_val,
-                "adset_cpr_type": as_cpr_type,
-                "adset_cpr_value": as_cpr_val,
+                cols["adset_id"].append(aset.get("id"))
+                cols["adset_name"].append(aset.get("name"))
+                cols["adset_effective_status"].append(aset.get("effective_status"))
+                cols["adset_result_type"].append(as_type)
+                cols["adset_result_value"].append(as_val)
+                cols["adset_cpr_type"].append(as_cpr_type)
+                cols["adset_cpr_value"].append(as_cpr_val)
 
                 # Ad
-                "ad_id": ad.get("id"),
-                "ad_name": ad.get("name"),
-                "ad_status": ad.get("status"),
-                "creative_title": ad.get("creative", {}).get("title"),
-                "ad_result_type": ad_type,
-                "ad_result_value": ad_val,
-                "ad_cpr_type": ad_cpr_type,
-                "ad_cpr_value": ad_cpr_val,
-            })
-
-    df = pd.DataFrame(rows)
+                cols["ad_id"].append(ad.get("id"))
+                cols["ad_name"].append(ad.get("name"))
+                cols["ad_status"].append(ad.get("status"))
+                cols["creative_title"].append(ad.get("creative", {}).get("title"))
+                cols["ad_result_type"].append(ad_type)
+                cols["ad_result_value"].append(ad_val)
+                cols["ad_cpr_type"].append(ad_cpr_type)
+                cols["ad_cpr_value"].append(ad_cpr_val)
+
+        # -----------------------------
+        # 3. Fetch Daily Ads , insights per ad?
+        # ------------------------------
+
+        # ======================================
+        ## MARK: 3- Get All Ads per Adset
+        # ======================================
+        # Ads are streamed page by page straight into the column buffers,
+        # so the raw ad payloads are never held in memory all at once.
+        async def _fetch_ads(a: Dict[str, Any]) -> None:
+            url = (
+                f"https://graph.facebook.com/v24.0/{a['id']}/ads"
+                f"?fields=id,name,status,effective_status,creative{{title}},"
+                f"insights.time_range({{'since':'{date_since}','until':'{date_until}'}})"
+                f"&time_increment=1"
+                f"{{date_start,date_stop,impressions,reach,spend,results,cost_per_result}}"
+                f"&limit=200"
+                f"&access_token={access_token}"
+            )
+
+            async for ad in _iter_paginated(client, url, limit):
+                _append_ad_rows(ad, a)
+
+        # Sibling adsets fetched concurrently
+        await tqdm_asyncio.gather(
+            *(_fetch_ads(a) for a in adset_map.values()),
+            desc="Adsets", unit="adset",
+        )
+
+
+    # One column-wise construction (no per-row dict hashing); rows were
+    # appended in request completion order, so fix a deterministic order
+    df = pd.DataFrame(cols).sort_values(
+        FACT_SORT_KEYS, kind="stable", ignore_index=True
+    )
 
     # ------------------------------
     # 5. Normalize result types
     # ------------------------------
     for col in ["campaign_result_type", "adset_result_type", "ad_result_type"]:
-        df[f"normalized_{col}"] = df[col].apply(normalize_result_type)
-        df[f"{col}_category"] = df[f"normalized_{col}"].apply(categorize_result_type)
+        normalized = normalize_result_type_series(df[col])
+        df[f"normalized_{col}"] = normalized.astype("category")
+        df[f"{col}_category"] = categorize_result_type_series(normalized).astype("category")
 
     # ------------------------------
     # 6. Type coercion (minimal)
@@ -379,4 +569,9 @@ def fetch_meta_daily_fact_table(
     df["campaign_date_start"] = pd.to_datetime(df["campaign_date_start"], errors="coerce")
     df["campaign_date_stop"] = pd.to_datetime(df["campaign_date_stop"], errors="coerce")
 
+    # Low-cardinality labels -> category (int codes, less memory)
+    for col in CATEGORICAL_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
     return df
\ No newline at end of file
@@ -5,6 +5,26 @@ from __future__ import annotations
 import pandas as pd
 
 
+def _normalize_join_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Canonicalize (campaign_id, date) join keys without copying the input.
+    campaign_id is only cast when upstream didn't already.
+    """
+    updates = {}
+
+    if not pd.api.types.is_string_dtype(df["campaign_id"]):
+        updates["campaign_id"] = df["campaign_id"].astype(str)
+
+    # Midnight-aligned datetime64 keys hash as int64 (no boxed date objects)
+    date = df["date"]
+    if not pd.api.types.is_datetime64_any_dtype(date):
+        date = pd.to_datetime(date)
+    if date.dt.tz is not None:
+        date = date.dt.tz_localize(None)
+    updates["date"] = date.dt.normalize()
+
+    return df.assign(**updates) if updates else df
+
 def build_canonical_daily_df(
         supermetrics_df: pd.DataFrame,
         meta_df: pd.DataFrame,
@@ -20,19 +40,10 @@ def build_canonical_daily_df(
     """
 
     # ----------------------------
-    # 1. Defensive copies
-    # ----------------------------
-    sm = supermetrics_df.copy()
-    meta = meta_df.copy()
-
+    # 1. Normalize join keys (no defensive copies; merge does not mutate)
     # ----------------------------
-    # 2. Normalize join keys
-    # ----------------------------
-    sm["campaign_id"] = sm["campaign_id"].astype(str)
-    meta["campaign_id"] = meta["campaign_id"].astype(str)
-
-    sm["date"] = pd.to_datetime(sm["date"]).dt.date
-    meta["date"] = pd.to_datetime(meta["date"]).dt.date
+    sm = _normalize_join_keys(supermetrics_df)
+    meta = _normalize_join_keys(meta_df)
 
     # ----------------------------
     # 3. Assert uniqueness (FAIL FAST)
@@ -50,20 +61,16 @@ def build_canonical_daily_df(
     #     raise ValueError(
     #         f"❌ Meta is not unique on (campaign_id, date).\n{dup}"
     #     )
-    if sm.duplicated(subset=["campaign_id", "date"]).any():
-        dup = sm.loc[
-            sm.duplicated(subset=["campaign_id", "date"]),
-            ["campaign_id", "date"]
-        ].head()
+    sm_dupes = sm.duplicated(subset=["campaign_id", "date"])
+    if sm_dupes.any():
+        dup = sm.loc[sm_dupes, ["campaign_id", "date"]].head()
         raise ValueError(
             f"❌ Supermetrics is not unique on (campaign_id, date).\n{dup}"
         )
 
-    if meta.duplicated(subset=["campaign_id", "date"]).any():
-        dup = meta.loc[
-            meta.duplicated(subset=["campaign_id", "date"]),
-            ["campaign_id", "date"]
-        ].head()
+    meta_dupes = meta.duplicated(subset=["campaign_id", "date"])
+    if meta_dupes.any():
+        dup = meta.loc[meta_dupes, ["campaign_id", "date"]].head()
         raise ValueError(
             f"❌ Meta is not unique on (campaign_id, date).\n{dup}"
         )
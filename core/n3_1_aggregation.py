@@ -8,11 +8,85 @@ from __future__ import annotations
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# -----------------------------------
+# Aggregation rules
+# -----------------------------------
+SUM_COLS = [
+    "impressions",
+    "clicks",
+    "clicks_all",
+    "spend",
+    "actions",
+]
+
+MEAN_COLS = [
+    "cpa",
+    "cpm",
+    "cost_per_1000_reach",
+]
+
+FIRST_COLS = [
+    "campaign_status",
+    "campaign_objective",
+    "campaign_start_date",
+    "campaign_end_date",
+]
+
+def _zero_to_nan(arr: np.ndarray) -> np.ndarray:
+    """
+    Denominator with 0 masked to NaN, so x / den yields NaN instead of inf.
+    """
+    return np.where(arr == 0, np.nan, arr)
+
+def _aggregate_arrow(table: pa.Table) -> pd.DataFrame:
+    """
+    Pre-aggregate an Arrow table to one row per (date, campaign) key
+    with pyarrow's hash group_by (same sum / mean / first rules).
+
+    Only the reduced DAILY x CAMPAIGN result is converted to pandas.
+    """
+    names = table.column_names
+
+    if table.num_rows == 0 or "date" not in names:
+        return table.to_pandas()
+
+    # day-level timestamps, like the pandas path
+    date = table["date"]
+    if pa.types.is_date(date.type):
+        date = pc.cast(date, pa.timestamp("ns"))
+    elif not pa.types.is_timestamp(date.type):
+        date = pa.array(pd.to_datetime(date.to_pandas(), errors="coerce"))
+    table = table.set_column(
+        names.index("date"), "date", pc.floor_temporal(date, unit="day")
+    )
+
+    keys = [c for c in ("date", "campaign_id", "campaign_name") if c in names]
+
+    rules = (
+        [(c, "sum", pc.ScalarAggregateOptions(min_count=0)) for c in SUM_COLS if c in names]
+        + [(c, "mean") for c in MEAN_COLS if c in names]
+        + [(c, "first") for c in FIRST_COLS if c in names]
+    )
+
+    # "first" is an ordered aggregation -> single-threaded group_by
+    out = table.group_by(keys, use_threads=False).aggregate(rules)
+    out = out.rename_columns([
+        n.rsplit("_", 1)[0] if n not in keys else n
+        for n in out.column_names
+    ])
+
+    return out.select(keys + [r[0] for r in rules]).to_pandas()
 
-def aggregate_daily_campaign(df: pd.DataFrame) -> pd.DataFrame:
+def aggregate_daily_campaign(df: pd.DataFrame | pa.Table) -> pd.DataFrame:
     """
     Aggregate row-level //Meta Ads data into DAILY × CAMPAIGN grain.
 
+    Accepts a pandas DataFrame or a pyarrow Table. A Table is grouped
+    in Arrow and only the aggregated result is converted to pandas.
+
     Operations:
     - group by date + campaign_id (+ campaign_name if present)
     - sum raw volume metrics
@@ -28,15 +102,20 @@ def aggregate_daily_campaign(df: pd.DataFrame) -> pd.DataFrame:
     - spend
     """
 
+    if isinstance(df, pa.Table):
+        # keys come back unique -> the pandas path below skips its groupby
+        df = _aggregate_arrow(df)
+
     if df.empty:
         return df.copy()
     
-    df = df.copy()
-
     # ----------------------------------
-    # 1. Ensure date is date (not datetime)
+    # 1. Ensure date is day-level datetime64 (not datetime.date objects)
     # ----------------------------------
-    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.date
+    # Kept as a separate key Series -> no full copy of the caller's df.
+    # Midnight-normalized datetime64 groups on int64 instead of object dates
+    # and is what build_metric_features consumes without re-parsing.
+    dates = pd.to_datetime(df["date"], errors="coerce").dt.normalize()
 
     # ----------------------------------
     # 2. Define grouping keys
@@ -45,33 +124,29 @@ def aggregate_daily_campaign(df: pd.DataFrame) -> pd.DataFrame:
 
     if "campaign_name" in df.columns:
         group_cols.append("campaign_name")
+
+    # String keys as categoricals: the groupby hashes int codes, not str objects
+    # (cast back after aggregation so downstream dtypes are unchanged)
+    cat_keys = [
+        c for c in group_cols[1:]
+        if pd.api.types.is_string_dtype(df[c])
+        and not isinstance(df[c].dtype, pd.CategoricalDtype)
+    ]
+    # Campaign-major key order: output rows come out sorted by
+    # (campaign_id, date), the order build_metric_features needs, for free
+    key_series = {
+        c: df[c].astype("category") if c in cat_keys else df[c]
+        for c in group_cols[1:]
+    }
+    key_series["date"] = dates
+    sort_cols = ["campaign_id", "date"] + group_cols[2:]
+    group_keys = [key_series[c] for c in sort_cols]
     
     # -----------------------------------
     # 3. Define aggregation rules
     # -----------------------------------
     agg_dict: dict[str, str] = {}
 
-    SUM_COLS = [
-        "impressions",
-        "clicks",
-        "clicks_all",
-        "spend",
-        "actions",
-    ]
-
-    MEAN_COLS = [
-        "cpa",
-        "cpm",
-        "cost_per_1000_reach",
-    ]
-
-    FIRST_COLS = [
-        "campaign_status",
-        "campaign_objective",
-        "campaign_start_date",
-        "campaign_end_date",
-    ]
-
     for col in SUM_COLS:
         if col in df.columns:
             agg_dict[col] = "sum"
@@ -123,12 +198,95 @@ def aggregate_daily_campaign(df: pd.DataFrame) -> pd.DataFrame:
     # ----------------------------
     # 4. Perform aggregation
     # ----------------------------
-    df_agg = (
-        df
-        .groupby(group_cols, dropna=False)
-        .agg(agg_dict)
-        .reset_index()
-    )
+    sum_cols = [c for c, a in agg_dict.items() if a == "sum"]
+
+    keys_mi = pd.MultiIndex.from_arrays(group_keys)
+
+    if keys_mi.is_unique:
+        # Already one row per key (pre-aggregated export): mean / first of a
+        # single row is the row itself, so skip the groupby entirely.
+        # Only sum differs (NaN sums to 0).
+        df_agg = pd.concat(
+            [dates, df[group_cols[1:] + list(agg_dict)]],
+            axis=1,
+        )
+        if not keys_mi.is_monotonic_increasing:
+            df_agg = df_agg.take(keys_mi.argsort())
+        df_agg = df_agg.reset_index(drop=True)
+
+        df_agg[sum_cols] = df_agg[sum_cols].fillna(0)
+    else:
+        # One grouper for the key -> group id mapping only. The reductions
+        # run in numpy: stable-sort rows by group id once, then every rule is
+        # an np.add.reduceat over the contiguous group slices.
+        gb = df.groupby(group_keys, dropna=False, observed=True)
+
+        group_ids = gb.ngroup().to_numpy()
+        order = np.argsort(group_ids, kind="stable")
+        starts = np.flatnonzero(np.r_[True, np.diff(group_ids[order]) != 0])
+        key_index = gb.size().index
+
+        # sum: NaN counts as 0; integer columns stay integer
+        # mean: sum of valid values / number of valid values
+        parts = []
+        reduced: dict[str, np.ndarray] = {}
+        for col, how in agg_dict.items():
+            if how == "first":
+                continue
+
+            v = df[col].to_numpy()
+            if v.dtype.kind not in "iu":
+                v = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            v = v[order]
+
+            if v.dtype.kind == "f":
+                valid = ~np.isnan(v)
+                v = np.where(valid, v, 0.0)
+
+            total = np.add.reduceat(v, starts)
+
+            if how == "mean":
+                count = (
+                    np.add.reduceat(valid, starts)
+                    if v.dtype.kind == "f"
+                    else np.diff(np.r_[starts, len(v)])
+                )
+                mean = np.full(len(starts), np.nan)
+                np.divide(total, count, out=mean, where=count > 0)
+                total = mean
+
+            reduced[col] = total
+
+        if reduced:
+            parts.append(pd.DataFrame(reduced, index=key_index))
+
+        # first(): each group's first NON-null value, like pandas and the
+        # Arrow hash_first path. Null rows get position n in the stable
+        # sort, so a minimum.reduceat finds the first valid row per group
+        # (n = the whole group is null).
+        first_cols = [c for c, a in agg_dict.items() if a == "first"]
+        if first_cols:
+            n = len(order)
+            positions = np.arange(n)
+            firsts = {}
+            for col in first_cols:
+                valid = df[col].notna().to_numpy()[order]
+                first = np.minimum.reduceat(np.where(valid, positions, n), starts)
+                found = first < n
+
+                picked = df[col].iloc[order[np.where(found, first, starts)]]
+                picked.index = key_index
+                firsts[col] = picked if found.all() else picked.where(found)
+
+            parts.append(pd.DataFrame(firsts, index=key_index))
+
+        df_agg = pd.concat(parts, axis=1)[list(agg_dict)]
+        # rows stay campaign-major; columns keep the date-first layout
+        df_agg.index = df_agg.index.reorder_levels(group_cols)
+        df_agg = df_agg.reset_index()
+
+        for c in cat_keys:
+            df_agg[c] = df_agg[c].astype(df[c].dtype)
 
     # ---------------------------------
     # 5. Recompute rate metrics (Source of Truth)
@@ -138,55 +296,51 @@ def aggregate_daily_campaign(df: pd.DataFrame) -> pd.DataFrame:
     #     df_agg["impressions"].replace({0: np.nan})
     # )
 
+    # Pull each operand out once, reuse across ratios
+    cols = {
+        c: df_agg[c].to_numpy(dtype=np.float64, na_value=np.nan)
+        for c in ("impressions", "clicks", "clicks_all", "spend", "actions")
+        if c in df_agg.columns
+    }
+
+    # Zero-masked denominators, built once and shared by every ratio
+    den = {
+        c: _zero_to_nan(cols[c])
+        for c in ("impressions", "clicks", "clicks_all", "actions")
+        if c in cols
+    }
+
     # CTRs
-    if {"clicks", "impressions"}.issubset(df_agg.columns):
-        df_agg["ctr_link"] = (
-            df_agg["clicks"] /
-            df_agg["impressions"].replace({0: np.nan})
-        )
+    if {"clicks", "impressions"}.issubset(cols):
+        df_agg["ctr_link"] = cols["clicks"] / den["impressions"]
     else:
         df_agg["ctr_link"] = np.nan
     
-    if {"clicks_all", "impressions"}.issubset(df_agg.columns):
-        df_agg["ctr_all"] = (
-            df_agg["clicks_all"] /
-            df_agg["impressions"].replace({0: np.nan})
-        )
+    if {"clicks_all", "impressions"}.issubset(cols):
+        df_agg["ctr_all"] = cols["clicks_all"] / den["impressions"]
     else:
         df_agg["ctr_all"] = np.nan
 
     # CPCs  
-    if {"spend", "clicks"}.issubset(df_agg.columns):
-        df_agg["cpc_link"] = (
-            df_agg["spend"] /
-            df_agg["clicks"].replace({0: np.nan})
-        )
+    if {"spend", "clicks"}.issubset(cols):
+        df_agg["cpc_link"] = cols["spend"] / den["clicks"]
     else:
         df_agg["cpc_link"] = np.nan
 
-    if {"spend", "clicks_all"}.issubset(df_agg.columns):
-        df_agg["cpc_all"] = (
-            df_agg["spend"] /
-            df_agg["clicks_all"].replace({0: np.nan})
-        )
+    if {"spend", "clicks_all"}.issubset(cols):
+        df_agg["cpc_all"] = cols["spend"] / den["clicks_all"]
     else:
         df_agg["cpc_all"] = np.nan
 
     # CPM
-    if {"spend", "impressions"}.issubset(df_agg.columns):
-        df_agg["cpm"] = (
-            df_agg["spend"] /
-            df_agg["impressions"].replace({0: np.nan})
-        ) * 1000
+    if {"spend", "impressions"}.issubset(cols):
+        df_agg["cpm"] = (cols["spend"] / den["impressions"]) * 1000
     else:
         df_agg["cpm"] = np.nan
 
     # CPA
-    if {"spend", "actions"}.issubset(df_agg.columns):
-        df_agg["cpa"] = (
-            df_agg["spend"] /
-            df_agg["actions"].replace({0: np.nan})
-        )
+    if {"spend", "actions"}.issubset(cols):
+        df_agg["cpa"] = cols["spend"] / den["actions"]
     else:
         df_agg["cpa"] = np.nan
         
@@ -214,6 +368,11 @@ def aggregate_daily_campaign(df: pd.DataFrame) -> pd.DataFrame:
     # --------------------------------
     # 7. Clean infinities
     # --------------------------------
-    df_agg = df_agg.replace([np.inf, -np.inf], np.nan)
+    # Float columns only; a column is rewritten only if it actually holds inf
+    for c in df_agg.select_dtypes(include=[np.floating]).columns:
+        v = df_agg[c].to_numpy()
+        is_inf = np.isinf(v)
+        if is_inf.any():
+            df_agg[c] = np.where(is_inf, np.nan, v)
 
     return df_agg
\ No newline at end of file
@@ -6,8 +6,11 @@
 
 from __future__ import annotations
 
+import functools
+
 import pandas as pd
 import numpy as np
+import pyarrow as pa
 
 BASE_METRICS = [
     "impressions",
@@ -24,8 +27,83 @@ BASE_METRICS = [
     "cpc_all",
 ]
 
+ROLL_WINDOWS = (7, 14, 28)
+
+# ------------------------------------
+# Internal: grouped window helpers
+# ------------------------------------
+def _row_group_starts(codes: np.ndarray) -> np.ndarray:
+    """
+    For every row, the position of the first row of its group
+    (codes must be sorted / contiguous).
+    """
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    return np.repeat(starts, np.diff(np.r_[starts, len(codes)]))
+
+def _grouped_rolling_means(
+        values: np.ndarray,
+        row_starts: np.ndarray,
+        windows=ROLL_WINDOWS,
+        out: np.ndarray | None = None,
+) -> dict[int, np.ndarray]:
+    """
+    Trailing rolling means per group, excluding the current row.
+    Sums accumulate in float64; results come back in values' dtype.
+
+    Same as groupby().shift(1).rolling(w, min_periods=max(3, w // 2)).mean()
+    evaluated within each group, for all metric columns and windows in one
+    pass over prefix sums (add entering row, subtract leaving row).
+
+    values: 2-D float array [rows, metrics], rows sorted by group.
+    row_starts: first row of each row's group (_row_group_starts).
+    out: optional [rows, metrics x windows] buffer (per-metric window
+    order, x_w1, x_w2, ...) written in place instead of allocating.
+    Returns {window: 2-D array of means} (views into out when given).
+    """
+    n, m = values.shape
+    valid = ~np.isnan(values)
+
+    # exclusive prefix sums: csum[i] = sum over rows < i
+    csum = np.zeros((n + 1, m))
+    np.cumsum(np.where(valid, values, 0.0), axis=0, dtype=np.float64, out=csum[1:])
+    # counts are exact small integers -> int32, half the bytes of float64
+    ccnt = np.zeros((n + 1, m), dtype=np.int32)
+    np.cumsum(valid, axis=0, dtype=np.int32, out=ccnt[1:])
+
+    rows = np.arange(n)
+
+    res: dict[int, np.ndarray] = {}
+    for k, w in enumerate(windows):
+        lo = np.maximum(rows - w, row_starts)
+        total = csum[rows] - csum[lo]
+        count = ccnt[rows] - ccnt[lo]
+
+        # divide in float64, cast straight into the destination slice
+        means = (
+            out[:, k::len(windows)] if out is not None
+            else np.empty((n, m), dtype=values.dtype)
+        )
+        means[:] = np.nan
+        np.divide(total, count, out=means, where=count >= max(3, w // 2))
+        res[w] = means
+
+    return res
+
+@functools.lru_cache(maxsize=8)
+def _feature_layout(metrics: tuple[str, ...]) -> tuple[list[str], list[str], list[str]]:
+    """
+    Output column names for a metric set: (lag | rolling | momentum).
+    Built once per metric tuple (in practice: once for BASE_METRICS)
+    instead of re-formatting ~6 x len(metrics) names on every call.
+    Callers must not mutate the returned lists.
+    """
+    lag_cols = [f"{col}_lag_{lag}" for col in metrics for lag in (1, 7)]
+    roll_cols = [f"{col}_roll_{w}" for col in metrics for w in ROLL_WINDOWS]
+    pct_cols = [f"{col}_pct_change" for col in metrics]
+    return lag_cols, roll_cols, pct_cols
+
 def build_metric_features(     # function name is build_ctr_features just because i wanted to streamline with other files. in reality, it should be named like build_metric_features
-        df: pd.DataFrame,
+        df: pd.DataFrame | pa.Table,
         min_history_days: int = 7,
 ) -> pd.DataFrame:
     """
@@ -45,24 +123,90 @@ def build_metric_features(     # function name is build_ctr_features just becaus
     - impressions
     - clicks
     - spend
+
+    A pyarrow Table is converted once at entry; every stage below works
+    on numpy buffers either way.
     """
 
+    if isinstance(df, pa.Table):
+        df = df.to_pandas()
+
     if df.empty:
         return df.copy()
     
-    df = df.copy()
-
     # ------------------------------------
     # 1. Sort correctly (Critical)
     # ------------------------------------
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df.sort_values(["campaign_id", "date"])
+    # Sort on a 2-column key frame, then take() once: the reordered frame
+    # is the only copy made, and the caller's df is never mutated.
+    dates = df["date"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors="coerce")
+    keys = pd.DataFrame({
+        "campaign_id": df["campaign_id"].to_numpy(),
+        "date": dates.to_numpy(),
+    })
+
+    if pd.MultiIndex.from_frame(keys).is_monotonic_increasing:
+        # aggregate_daily_campaign output is already (campaign_id, date)
+        # sorted: no reorder, only a shallow copy so the caller's df is
+        # never mutated by the column writes below
+        df = df.copy(deep=False)
+        df.index = pd.RangeIndex(len(df))
+        df["date"] = keys["date"].to_numpy()
+    else:
+        order = (
+            keys
+            .sort_values(["campaign_id", "date"], kind="mergesort")
+            .index
+            .to_numpy()
+        )
+
+        df = df.take(order)
+        df.index = pd.RangeIndex(len(df))
+        df["date"] = keys["date"].to_numpy()[order]
+
+    # Campaign codes + per-row group start, built once for every stage below
+    # (passing the Series lets a categorical campaign_id reuse its codes)
+    codes, uniques = pd.factorize(df["campaign_id"], sort=False)
+
+    # Campaigns with fewer rows than min_history_days can never pass the
+    # strict history filter in step 8 (it only ever removes rows), so
+    # drop them before any feature work instead of after
+    if min_history_days > 1:
+        has_key = codes >= 0
+        sizes = np.bincount(codes[has_key], minlength=len(uniques))
+        enough = has_key & (sizes[np.where(has_key, codes, 0)] >= min_history_days)
+        if not enough.all():
+            kept_rows = np.flatnonzero(enough)
+            df = df.take(kept_rows)
+            df.index = pd.RangeIndex(len(df))
+            codes = codes[kept_rows]
+
+    row_starts = _row_group_starts(codes)
+    rows = np.arange(len(df))
 
     # ------------------------------------
     # 2. Determine usable metrics
     # ------------------------------------
     metrics = [m for m in BASE_METRICS if m in df.columns]
 
+    # float32 halves the bytes every lag / rolling / momentum pass moves;
+    # ample precision for counts, spend and rates (and what XGBoost uses anyway)
+    df[metrics] = df[metrics].astype(np.float32)
+    values = df[metrics].to_numpy(dtype=np.float32, na_value=np.nan)
+
+    # All derived features land in ONE preallocated float32 buffer, laid out
+    # by family (lags | rolling | momentum), then join df in a single concat
+    # instead of ~6 x len(metrics) one-column inserts.
+    m = len(metrics)
+    lag_cols, roll_cols, pct_cols = _feature_layout(tuple(metrics))
+
+    buf = np.empty((len(df), 6 * m), dtype=np.float32)
+    lag_buf = buf[:, : 2 * m]
+    roll_buf = buf[:, 2 * m : 5 * m]
+    pct_buf = buf[:, 5 * m :]
+
     # ------------------------------------
     # 3. LAG FEATURES
     # ------------------------------------
@@ -77,11 +221,16 @@ def build_metric_features(     # function name is build_ctr_features just becaus
     # }
 
     #for col, lags in LAG_FEATURES.items():
-    for col in metrics:
-        for lag in (1, 7):
-            df[f"{col}_lag_{lag}"] = (
-                df.groupby("campaign_id")[col].shift(lag)
-            )
+    # Grouped shift as an indexed take on the metric matrix: row i reads
+    # row i - lag when that is still inside its campaign, else NaN.
+    # per-metric column order (x_lag_1, x_lag_7, y_lag_1, ...)
+    for j, lag in enumerate((1, 7)):
+        src = rows - lag
+        lag_buf[:, j::2] = np.where(
+            (src >= row_starts)[:, None],
+            values.take(np.maximum(src, 0), axis=0),
+            np.nan,
+        )
 
     # ------------------------------------
     # 4. ROLLING WINDOW FEATURES
@@ -96,29 +245,31 @@ def build_metric_features(     # function name is build_ctr_features just becaus
     #     "clicks": [7, 14],
     # }
     
-    # for col, windows in ROLLING_FEATURES.items():
-    for col in metrics:
-        for w in (7, 14, 28):
-
-            min_p = max(3, w // 2)
-
-            df[f"{col}_roll_{w}"] = (
-                df.groupby("campaign_id")[col]
-                .shift(1)
-                .rolling(w, min_periods=min_p)
-                .mean()
-            )
+    # All metrics x all windows in one sweep, strictly within each campaign
+    # (written straight into roll_buf: no per-window temporaries)
+    _grouped_rolling_means(values, row_starts, out=roll_buf)
     
     # ---------------------------------------
     # 5. Momentum / Percentage Change
     # ---------------------------------------
-    for col in metrics:
-        lag_col = f"{col}_lag_1"
-        if lag_col in df.columns:
-            df[f"{col}_pct_change"] = (
-                (df[col] - df[lag_col]) / 
-                df[lag_col].replace({0: np.nan})
-            )
+    # (cur - prev) / prev over all metrics in one 2-D sweep
+    prev = lag_buf[:, 0::2]
+
+    pct_buf[:] = np.nan
+    np.divide(values - prev, prev, out=pct_buf, where=prev != 0)
+
+    df = pd.concat(
+        [
+            df,
+            pd.DataFrame(
+                buf,
+                index=df.index,
+                columns=lag_cols + roll_cols + pct_cols,
+                copy=False,
+            ),
+        ],
+        axis=1,
+    )
     
     # if {"ctr_link", "ctr_link_lag_1"}.issubset(df.columns):
     # #if "ctr_link" in df.columns and "ctr_link_lag_1" in df.columns:
@@ -146,40 +297,52 @@ def build_metric_features(     # function name is build_ctr_features just becaus
     #     df["retargeting_pool"] = np.nan
 
     if "actions" in df.columns:
-        df["retargeting_pool"] = (
-            df.groupby("campaign_id")["actions"]
-                #.apply(lambda x: x.fillna(0).cumsum())
-                .transform(lambda x: x.fillna(0).cumsum())
-        )
+        # df.groupby("campaign_id")["actions"].transform(lambda x: x.fillna(0).cumsum())
+        # -> one global cumsum, minus the running total at each campaign's start
+        actions = np.nan_to_num(df["actions"].to_numpy(dtype=np.float64, na_value=np.nan))
+        cum = np.cumsum(actions)
+        before_start = cum[row_starts] - actions[row_starts]
+        df["retargeting_pool"] = (cum - before_start).astype(np.float32)
     else:
         df["retargeting_pool"] = np.nan
     
     # -------------------------------------------
     # 7. Time-Based Features
     # -------------------------------------------
-    df["day_of_week"] = df["date"].dt.dayofweek
-    df["week_number"] = df["date"].dt.isocalendar().week.astype(int)
+    df["day_of_week"] = df["date"].dt.dayofweek.astype("int8")
+    df["week_number"] = df["date"].dt.isocalendar().week.astype("int8")
 
     # ------------------------------------------------------------
     # 8. Remove Rows that do not have enough history for lag/rolling features
     # ------------------------------------------------------------
-    history_cols = [
-        c for c in df.columns
-        if c.endswith("_lag_1") or c.endswith("_roll_7")
-        # if "_lag_" in c or "_roll_" in c
-    ]
-    
-    if history_cols:
-        df = df.dropna(subset=history_cols)
+    # *_lag_1 and *_roll_7 straight from the feature buffer:
+    # one isnan sweep per 2-D view instead of dropna column by column
+    if m:
+        missing_history = (
+            np.isnan(lag_buf[:, 0::2]).any(axis=1)
+            | np.isnan(roll_buf[:, ROLL_WINDOWS.index(7)::len(ROLL_WINDOWS)]).any(axis=1)
+        )
+        df = df[~missing_history]
 
     # Optional: strict history window
     if min_history_days > 1:
-        counts = df.groupby("campaign_id")["date"].transform("count")
-        df = df[counts >= min_history_days]
+        # RangeIndex from step 1 maps surviving rows back to their codes
+        kept = codes[df.index.to_numpy()]
+        has_key = kept >= 0
+        counts = np.bincount(
+            kept[has_key & df["date"].notna().to_numpy()],
+            minlength=len(uniques),
+        )
+        df = df[has_key & (counts[kept] >= min_history_days)]
 
     # ---------------------------------------------
     # 8. Final cleanup
     # ---------------------------------------------
-    df = df.replace([np.inf, -np.inf], np.nan)
+    # Float columns only; a column is rewritten only if it actually holds inf
+    for c in df.select_dtypes(include=[np.floating]).columns:
+        v = df[c].to_numpy()
+        is_inf = np.isinf(v)
+        if is_inf.any():
+            df[c] = np.where(is_inf, np.nan, v)
 
     return df
\ No newline at end of file
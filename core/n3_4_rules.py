@@ -54,6 +54,22 @@ METRIC_RULES = {
         "baseline": "roll_7",
     },
 }
+# Column names resolved once at import:
+# (metric, pred_col, baseline_col, ratio_col, severity_col, flag_col, direction, threshold)
+_COMPILED_RULES = [
+    (
+        metric,
+        f"pred_{metric}",
+        f"{metric}_{cfg['baseline']}",
+        f"{metric}_ratio",
+        f"{metric}_severity",
+        f"{metric}_flag",
+        cfg["direction"],
+        cfg["threshold"],
+    )
+    for metric, cfg in METRIC_RULES.items()
+]
+
 # ---------------------------------
 # Thresholds (explicit)
 # ---------------------------------
@@ -88,6 +104,57 @@ def severity_from_ratio(ratio: float, direction: str) -> str:
 
     return "normal"
 
+# Ordered low -> high, so category codes double as severity rank
+SEVERITY_LEVELS = ["unknown", "normal", "warning", "critical"]
+
+# direction -> (critical cutoff, warning cutoff), same as severity_from_ratio
+SEVERITY_CUTOFFS = {
+    "down": (0.70, 0.85),
+    "up": (1.50, 1.20),
+}
+
+def _signed_cutoffs(directions: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per-column (sign, warning cutoff, critical cutoff) with "down" columns
+    negated (x -> -x), so every severity test becomes a plain ">".
+    """
+    d = np.asarray(directions)
+    sign = np.where(d == "down", -1.0, 1.0)
+
+    # unknown direction -> NaN cutoffs, never crossed -> "normal"
+    crit, warn = np.array(
+        [SEVERITY_CUTOFFS.get(x, (np.nan, np.nan)) for x in d]
+    ).reshape(-1, 2).T
+
+    return sign, warn * sign, crit * sign
+
+def _severity_codes_signed(
+        signed: np.ndarray,
+        warn: np.ndarray,
+        crit: np.ndarray,
+) -> np.ndarray:
+    """
+    Severity codes from sign-flipped ratios (see _signed_cutoffs).
+    The critical cutoff is always past the warning one, so
+    code = 1 (normal) + crossed warning + crossed critical, 0 if NaN.
+    """
+    codes = np.ones(signed.shape, dtype=np.int8)
+    codes += signed > warn
+    codes += signed > crit
+    codes[np.isnan(signed)] = 0
+
+    return codes
+
+# Rule cutoffs specialised once at import, aligned with _COMPILED_RULES:
+# each metric's direction is folded into its signs, so generate_signals
+# only multiplies and compares (no per-call direction dispatch)
+_RULE_SIGN, _RULE_WARN, _RULE_CRIT = _signed_cutoffs(
+    [r[6] for r in _COMPILED_RULES]
+)
+_RULE_THRESHOLD = (
+    _RULE_SIGN * np.array([r[7] for r in _COMPILED_RULES], dtype=np.float32)
+).astype(np.float32)
+
 # ========================================================
 # MARK: 11.5 — Output DataFrame for Step 12 (recommendations)
 # ========================================================
@@ -106,6 +173,7 @@ def generate_signals(df: pd.DataFrame) -> pd.DataFrame:
     - campaign_name (optional, for messages)
 
     Output columns:
+    - signal_count / has_signal
     - ctr_drop_flag
     - spend_spike_flag
     - retargetting_pool_large
@@ -115,11 +183,19 @@ def generate_signals(df: pd.DataFrame) -> pd.DataFrame:
     - alert_msg
     """
 
-    if df.empty:
-        return df.copy()
-    
-    df = df.copy()
+    # if df.empty:
+    #     return df.copy()
+    # A 0-row frame runs the normal path (empty arrays cost nothing), so it
+    # comes back with the same columns / dtypes as a non-empty run.
+    # Only a keyless empty frame is returned as-is: nothing to add, no copy.
+    if df.empty and "campaign_id" not in df.columns:
+        return df
+
+    # df = df.copy()
+    # No defensive copy: existing columns are only read. New columns are
+    # built on the side and joined to df in ONE concat at the end.
     signal_flags = []
+    new = pd.DataFrame(index=df.index)
 
     """
     # ----------------------------------------------
@@ -134,41 +210,56 @@ def generate_signals(df: pd.DataFrame) -> pd.DataFrame:
     # 2. Flags
     # ----------------------------------------------
 
-    for metric, cfg in METRIC_RULES.items():
-        pred_col = f"pred_{metric}"
-        baseline_col = f"{metric}_{cfg['baseline']}"
-
-        if pred_col not in df.columns or baseline_col not in df.columns:
-            continue
-
-        ratio_col = f"{metric}_ratio"
-        severity_col = f"{metric}_severity"
-        flag_col = f"{metric}_flag"
+    # All metrics in one SoA pass: [rows, metrics] pred / baseline matrices
+    # -> ratios, severity codes and flags, then ONE concat onto df.
+    cols = frozenset(df.columns)
+    keep = [
+        i for i, r in enumerate(_COMPILED_RULES)
+        if r[1] in cols and r[2] in cols
+    ]
+    rules = [_COMPILED_RULES[i] for i in keep]
+
+    if rules:
+        (
+            _, pred_cols, base_cols, ratio_cols, sev_cols, flag_cols,
+            directions, thresholds,
+        ) = map(list, zip(*rules))
 
         # -------------------------
         # Ratio
         # -------------------------
-        df[ratio_col] = (
-            df[pred_col] /
-            df[baseline_col].replace({0: np.nan})
-        )
+        pred = df[pred_cols].to_numpy(np.float32, na_value=np.nan)
+        base = df[base_cols].to_numpy(np.float32, na_value=np.nan)
+
+        ratios = np.full_like(pred, np.nan)
+        np.divide(pred, base, out=ratios, where=base != 0)
 
         # --------------------------
         # Severity
         # --------------------------
-        df[severity_col] = df[ratio_col].apply(
-            lambda r: severity_from_ratio(r, cfg["direction"])
+        signed = ratios * _RULE_SIGN[keep].astype(np.float32)
+        sev_codes = _severity_codes_signed(
+            signed, _RULE_WARN[keep], _RULE_CRIT[keep]
         )
 
         # ----------------------------
         # Binary alert flag (for gating)
         # ----------------------------
-        if cfg["direction"] == "down":
-            df[flag_col] = (df[ratio_col] < cfg["threshold"]).astype(int)
-        else:
-            df[flag_col] = (df[ratio_col] > cfg["threshold"]).astype(int)
-        
-        signal_flags.append(flag_col)
+        # Same signed ratio buffer as severity: one ">" per cell
+        # (bool is already 1 byte: view it as int8 instead of casting a copy)
+        flags = np.greater(signed, _RULE_THRESHOLD[keep]).view(np.int8)
+
+        new_cols = {}
+        for j in range(len(rules)):
+            new_cols[ratio_cols[j]] = ratios[:, j]
+            new_cols[sev_cols[j]] = pd.Categorical.from_codes(
+                sev_codes[:, j], categories=SEVERITY_LEVELS, ordered=True
+            )
+            new_cols[flag_cols[j]] = flags[:, j]
+
+        signal_flags.extend(flag_cols)
+
+        new = pd.DataFrame(new_cols, index=df.index)
     
     # ===============================================
     # GLOBAL PRIORITY SIGNALS
@@ -179,78 +270,119 @@ def generate_signals(df: pd.DataFrame) -> pd.DataFrame:
     # else:
     #     df["signal_count"] = 0
     
-    severity_rank = {"critical": 3, "warning": 2, "normal": 1, "unknown": 0}
+    # severity_rank = {"critical": 3, "warning": 2, "normal": 1, "unknown": 0}
+
+    def get(col, default=None):
+        # df.get() over input + new rule columns, without joining them yet
+        return new[col] if col in new.columns else df.get(col, default)
+
+    severity_cols = [
+        c for c in [*df.columns, *new.columns] if c.endswith("_severity")
+    ]
 
-    severity_cols = [c for c in df.columns if c.endswith("_severity")]
+    # Everything below is collected here and joins df in ONE concat
+    signals: dict[str, object] = {}
 
-    df["signal_count"] = df[signal_flags].sum(axis=1) if signal_flags else 0
+    # int8 flag matrix straight from the rule pass -> one narrow row-sum
+    # (no per-column re-extraction / stack)
+    signals["signal_count"] = (
+        flags.sum(axis=1, dtype=np.int16)
+        if signal_flags else 0
+    )
 
-    df["max_severity"] = (
-        df[severity_cols]
-        .apply(lambda row: max(row.map(severity_rank)), axis=1)
-        .map({v: k for k, v in severity_rank.items()})
-        if severity_cols else "normal"
+    # "any signal?" gate for alerting: a 1-byte bool instead of a count
+    signals["has_signal"] = (
+        flags.any(axis=1)
+        if signal_flags else False
     )
 
+    # df["max_severity"] = (
+    #     df[severity_cols]
+    #     .apply(lambda row: max(row.map(severity_rank)), axis=1)
+    #     .map({v: k for k, v in severity_rank.items()})
+    #     if severity_cols else "normal"
+    # )
+
+    # Ordered categorical codes ARE the severity rank -> one row-wise max
+    if severity_cols:
+        codes = np.stack(
+            [
+                pd.Categorical(get(c), categories=SEVERITY_LEVELS, ordered=True).codes
+                for c in severity_cols
+            ],
+            axis=1,
+        )
+        signals["max_severity"] = pd.Categorical.from_codes(
+            codes.max(axis=1), categories=SEVERITY_LEVELS, ordered=True
+        )
+    else:
+        signals["max_severity"] = "normal"
+
     """ Ubah dekat sini """
     # ==============================================
     # 3. Creative Fatigue (attention decay)
     # ==============================================
-    df["creative_fatigue_flag"] = (
-        (df.get("ctr_link_ratio", 1) < 0.85) &
-        (df.get("cpc_link_ratio", 1) < 1.15) &
-        (df.get("spend_pct_change", 0).abs() < 0.10)
-    ).astype(int)
+    signals["creative_fatigue_flag"] = (
+        (get("ctr_link_ratio", 1) < 0.85) &
+        (get("cpc_link_ratio", 1) < 1.15) &
+        (get("spend_pct_change", 0).abs() < 0.10)
+    ).astype(np.int8)
     
-    df["creative_fatigue_confidence"] = (
-        (df.get("ctr_link_severity") == "critical").astype(int) +
-        (df.get("cpc_link_severity") == "critical").astype(int)
+    signals["creative_fatigue_confidence"] = (
+        (get("ctr_link_severity") == "critical").astype(np.int8) +
+        (get("cpc_link_severity") == "critical").astype(np.int8)
     )
 
     # ==============================================
     # 4. Offer Testing Velocity (recovery speed)
     # ==============================================
-    df["offer_recovery_event"] = (
-        (df.get("ctr_link_ratio", 0) > 1.0) &
-        (df.get("ctr_link_pct_change", 0) > 0) &
-        (df.get("spend_pct_change", 0).abs() < 0.15)
-    ).astype(int)
-
-    df["days_since_last_recovery"] = (
-        df.groupby("campaign_id")["offer_recovery_event"]
+    signals["offer_recovery_event"] = (
+        (get("ctr_link_ratio", 0) > 1.0) &
+        (get("ctr_link_pct_change", 0) > 0) &
+        (get("spend_pct_change", 0).abs() < 0.15)
+    ).astype(np.int8)
+
+    signals["days_since_last_recovery"] = (
+        signals["offer_recovery_event"]
+        .groupby(df["campaign_id"], observed=True)
         .cumsum()
-        .groupby(df["campaign_id"])
+        .groupby(df["campaign_id"], observed=True)
         .cumcount()
     )
 
-    df["offer_testing_velocity_flag"] = (
-        (df.get("ctr_link_ratio", 1) < 0.85) &
-        (df["days_since_last_recovery"] > 14)
-    ).astype(int)
+    signals["offer_testing_velocity_flag"] = (
+        (get("ctr_link_ratio", 1) < 0.85) &
+        (signals["days_since_last_recovery"] > 14)
+    ).astype(np.int8)
 
     # =================================================
     # 5. Spend Distribution (misallocation)
     # =================================================
-    df["spend_misalignment_flag"] = (
-        (df.get("spend_pct_change", 0) > 0.20) &
-        (df.get("ctr_link_ratio", 1) < 0.85) &
-        (df.get("cpa_ratio", 1) > 1.25)
-    ).astype(int)
+    signals["spend_misalignment_flag"] = (
+        (get("spend_pct_change", 0) > 0.20) &
+        (get("ctr_link_ratio", 1) < 0.85) &
+        (get("cpa_ratio", 1) > 1.25)
+    ).astype(np.int8)
     
     # =================================================
     # 6. Retargetting Pool Health
     # =================================================
-    df["retargeting_pool_ready"] = (
-        (df.get("retargeting_pool", 0) >= 2500) &
-        (df.get("ctr_link_ratio", 1) < 0.9) &
-        (df.get("cpa_ratio", 1) <= 1.1)
-    ).astype(int)
-
-    df["retargeting_pool_saturated"] = (
-        (df.get("retargeting_pool", 0) >= 2500) &
-        (df.get("ctr_link_ratio", 1) < 0.85) &
-        (df.get("cpa_ratio", 1) > 1.25)
-    ).astype(int)
+    signals["retargeting_pool_ready"] = (
+        (get("retargeting_pool", 0) >= 2500) &
+        (get("ctr_link_ratio", 1) < 0.9) &
+        (get("cpa_ratio", 1) <= 1.1)
+    ).astype(np.int8)
+
+    signals["retargeting_pool_saturated"] = (
+        (get("retargeting_pool", 0) >= 2500) &
+        (get("ctr_link_ratio", 1) < 0.85) &
+        (get("cpa_ratio", 1) > 1.25)
+    ).astype(np.int8)
+
+    df = pd.concat(
+        [df, new, pd.DataFrame(signals, index=df.index)],
+        axis=1,
+    )
 
     return df
         
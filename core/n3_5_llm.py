@@ -2,10 +2,17 @@
 
 from __future__ import annotations
 
+import functools
+import hashlib
+import importlib.util
 import json
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Any, Iterator, List
 
-from openai import OpenAI
+# openai (httpx, pydantic, ...) is imported only where a client is built,
+# so importing this module stays cheap on paths that never call the LLM
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 
 # ========================================================
@@ -14,7 +21,7 @@ from openai import OpenAI
 # LLM_OUTPUT_KEYS = {"reason", "recommendation", "summary"}
 LLM_OUTPUT_KEYS = {"explanations", "recommendation", "summary"}
 
-SUPPROTED_METRICS = {
+SUPPORTED_METRICS = frozenset({
     "ctr_link",
     "ctr_all",
     "cpc_link",
@@ -22,13 +29,92 @@ SUPPROTED_METRICS = {
     "cpa",
     "cpm",
     "cost_per_1000_reach",
-}
+})
+
+# System prompt is static: built once at import, shared by every call
+_SYSTEM_RULES = (
+    "You are a senior digital marketing strategist advising a non-technical marketing team.\n\n"
+
+    "You will receive STRUCTURED campaign performance data and diagnostic signals.\n"
+    "All inputs are factual. Do not assume missing information.\n\n"
+
+    "Your job is to:\n"
+    "1) Explain clearly what is happening\n"
+    "2) Explain why it matters for performance, budget, or opportunity\n"
+    "3) Recommend specific, concrete actions\n\n"
+
+    "Strict rules:\n"
+    "- Do NOT invent numbers, trends, or causes\n"
+    "- Use ONLY the provided fields and signals\n"
+    "- Numbers are allowed ONLY if they clarify severity, scale, or urgency\n"
+    "- Do NOT list or paraphrase metrics for their own sake\n"
+    "- Every number mentioned must directly support a recommendation\n"
+    "- Do NOT mention models, ML, algorithms, or data science\n"
+    "- Avoid technical or platform-specific jargon\n"
+    "- If signals are weak, conflicting, or insufficient, say so clearly and recommend no action\n\n"
+
+    "Tone and style:\n"
+    "- Plain English\n"
+    "- Professional and confident\n"
+    "- Short sentences\n"
+    "- No hedging language unless evidence is weak\n\n"
+)
+
+_SYSTEM_MSG = _SYSTEM_RULES + (
+    "Output format (MANDATORY):\n"
+    "What’s happening:\n"
+    "<2–4 short sentences explaining the situation>\n\n"
+    "Why it matters:\n"
+    "<1–2 sentences explaining impact on results, cost, or opportunity>\n\n"
+    "What to do:\n"
+    "<1–3 concrete actions written as imperatives>\n\n"
+    "Summary:\n"
+    "<One short sentence takeaway>"
+)
+
+_SYSTEM_SLOT = {"role": "system", "content": _SYSTEM_MSG}
+
+# Multi-row variant: same rules, one JSON answer covering every input row
+_MULTI_SYSTEM_MSG = _SYSTEM_RULES + (
+    "You will receive SEVERAL campaign rows at once, each with an \"id\".\n"
+    "Treat every row independently.\n\n"
+
+    "Output format (MANDATORY):\n"
+    "Return ONE JSON object:\n"
+    "{\"rows\": [{\"id\": <row id>, "
+    "\"explanation\": <what is happening and why it matters, 3–6 short sentences>, "
+    "\"recommendation\": <1–3 concrete actions written as imperatives>, "
+    "\"summary\": <one short sentence takeaway>}]}\n"
+    "Exactly one entry per input row, with the row's id unchanged."
+)
+
+_MULTI_SYSTEM_SLOT = {"role": "system", "content": _MULTI_SYSTEM_MSG}
 
 # ========================================================
 # LLM CLIENT (dependency injection friendly)
 # ========================================================
+@functools.lru_cache(maxsize=4)
 def get_openai_client(api_key: str) -> OpenAI:
-    return OpenAI(api_key=api_key)
+    """
+    One client (and connection pool) per key, reused across pipeline runs
+    in the same process.
+
+    Pool sized for MAX_CONCURRENT_LLM_CALLS threads; with the optional
+    h2 package installed, those requests multiplex over one HTTP/2
+    connection instead of one TCP + TLS handshake each.
+    """
+    from openai import DefaultHttpxClient, OpenAI
+    import httpx
+
+    http_client = DefaultHttpxClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(
+            max_connections=MAX_CONCURRENT_LLM_CALLS,
+            max_keepalive_connections=MAX_CONCURRENT_LLM_CALLS,
+        ),
+    )
+
+    return OpenAI(api_key=api_key, http_client=http_client)
 
 # ========================================================
 # PAYLOAD VALIDATION
@@ -47,7 +133,9 @@ def validate_payload(payload: Dict[str, Any]) -> None:
     if not isinstance(payload["metrics_flagged"], list):
         raise TypeError("'metrics_flagged' must be a list")
     
-    unknown = set(payload["metrics_flagged"]) - SUPPROTED_METRICS
+    # unknown = set(payload["metrics_flagged"]) - SUPPROTED_METRICS
+    # one scan over the list, no temporary set per payload
+    unknown = [m for m in payload["metrics_flagged"] if m not in SUPPORTED_METRICS]
     if unknown:
         raise ValueError(f"Unsupported metrics in payload: {unknown}")
     
@@ -60,51 +148,97 @@ def build_llm_prompt(payload: Dict[str, Any]) -> list[Dict[str, str]]:
     A strict, metric-aware, non-hallucinating prompt.
     """
 
-    system_msg = (
-        "You are a senior digital marketing strategist advising a non-technical marketing team.\n\n"
-
-        "You will receive STRUCTURED campaign performance data and diagnostic signals.\n"
-        "All inputs are factual. Do not assume missing information.\n\n"
-
-        "Your job is to:\n"
-        "1) Explain clearly what is happening\n"
-        "2) Explain why it matters for performance, budget, or opportunity\n"
-        "3) Recommend specific, concrete actions\n\n"
-
-        "Strict rules:\n"
-        "- Do NOT invent numbers, trends, or causes\n"
-        "- Use ONLY the provided fields and signals\n"
-        "- Numbers are allowed ONLY if they clarify severity, scale, or urgency\n"
-        "- Do NOT list or paraphrase metrics for their own sake\n"
-        "- Every number mentioned must directly support a recommendation\n"
-        "- Do NOT mention models, ML, algorithms, or data science\n"
-        "- Avoid technical or platform-specific jargon\n"
-        "- If signals are weak, conflicting, or insufficient, say so clearly and recommend no action\n\n"
-
-        "Tone and style:\n"
-        "- Plain English\n"
-        "- Professional and confident\n"
-        "- Short sentences\n"
-        "- No hedging language unless evidence is weak\n\n"
-
-        "Output format (MANDATORY):\n"
-        "What’s happening:\n"
-        "<2–4 short sentences explaining the situation>\n\n"
-        "Why it matters:\n"
-        "<1–2 sentences explaining impact on results, cost, or opportunity>\n\n"
-        "What to do:\n"
-        "<1–3 concrete actions written as imperatives>\n\n"
-        "Summary:\n"
-        "<One short sentence takeaway>"
-    )
+    # system_msg = (...)  -> hoisted to _SYSTEM_MSG / _SYSTEM_SLOT
+
+    # Compact JSON: the model doesn't need indentation, and every
+    # whitespace character is an input token on every call
+    user_msg = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+    return [
+        _SYSTEM_SLOT,
+        {"role": "user", "content": user_msg},
+    ]
 
-    user_msg = json.dumps(payload, indent=2)
+def build_llm_multi_prompt(payloads: List[Dict[str, Any]]) -> list[Dict[str, str]]:
+    """
+    Several payloads in one prompt; row ids are their positions.
+    """
+    user_msg = json.dumps(
+        {"rows": [{"id": k, **payload} for k, payload in enumerate(payloads)]},
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
 
     return [
-        {"role": "system", "content": system_msg},
+        _MULTI_SYSTEM_SLOT,
         {"role": "user", "content": user_msg},
     ]
 
+# ========================================================
+# RESPONSE PARSING
+# ========================================================
+_SYSTEM_ISSUE_TEXT = (
+    "What’s happening:\n"
+    "Unable to generate explanation due to a system issue.\n\n"
+    "What to do:\n"
+    "Review campaign performance manually.\n\n"
+    "Summary:\n"
+    "LLM explanation unavailable."
+)
+
+_BATCH_ERROR_TEXT = (
+    "What's happening:\n"
+    "LLM failed to generate explanation.\n\n"
+    "What to do:\n"
+    "Manual review required.\n\n"
+    "Summary:\n"
+    "LLM error."
+)
+
+def _parse_llm_sections(text: str) -> Dict[str, str]:
+    """
+    Split the model's formatted answer into explanation / recommendation / summary.
+    """
+    # Basic section parsing (robust + simple)
+    sections = {
+        "explanation": "",
+        "recommendation": "",
+        "summary": "",
+    }
+
+    current = None
+    buffer = []
+
+    for line in text.splitlines():
+        line = line.strip()
+
+        if line.lower().startswith("what's happening"):
+            current = "explanation"
+            buffer = []
+            continue
+        elif line.lower().startswith("what to do"):
+            sections[current] = " ".join(buffer).strip()
+            current = "recommendation"
+            buffer = []
+            continue
+        elif line.lower().startswith("summary"):
+            sections[current] = " ".join(buffer).strip()
+            current = "summary"
+            buffer = []
+            continue
+
+        if current:
+            buffer.append(line)
+
+    if current and buffer:
+        sections[current] = " ".join(buffer).strip()
+
+    # Final safety
+    for k in LLM_OUTPUT_KEYS:
+        sections.setdefault(k, "")
+
+    return sections
+
 # ========================================================
 # MAIN LLM EXPLANATION FUNCTION
 # ========================================================
@@ -150,56 +284,11 @@ def generate_llm_explanation(
             #response_format={"type": "json_object"},
         )
     except Exception:
-        return (
-            "What’s happening:\n"
-            "Unable to generate explanation due to a system issue.\n\n"
-            "What to do:\n"
-            "Review campaign performance manually.\n\n"
-            "Summary:\n"
-            "LLM explanation unavailable."
-        )
+        return _SYSTEM_ISSUE_TEXT
 
     text = response.choices[0].message.content.strip()
 
-    # Basic section parsing (robust + simple)
-    sections = {
-        "explanation": "",
-        "recommendation": "",
-        "summary": "",
-    }
-
-    current = None
-    buffer = []
-
-    for line in text.splitlines():
-        line = line.strip()
-
-        if line.lower().startswith("what's happening"):
-            current = "explanation"
-            buffer = []
-            continue
-        elif line.lower().startswith("what to do"):
-            sections[current] = " ".join(buffer).strip()
-            current = "recommendation"
-            buffer = []
-            continue
-        elif line.lower().startswith("summary"):
-            sections[current] = " ".join(buffer).strip()
-            current = "summary"
-            buffer = []
-            continue
-
-        if current:
-            buffer.append(line)
-
-    if current and buffer:
-        sections[current] = " ".join(buffer).strip()
-
-    # Final safety
-    for k in LLM_OUTPUT_KEYS:
-        sections.setdefault(k, "")
-
-    return sections
+    return _parse_llm_sections(text)
     """
     # Very light safety check
     if len(text) < 50:
@@ -234,38 +323,148 @@ def generate_llm_explanation(
     # }
 
 
+# ========================================================
+# MULTI-ROW VARIANT (one request for several rows)
+# ========================================================
+LLM_BATCH_SIZE = 10
+
+def generate_llm_explanations_multi(
+        client: OpenAI,
+        payloads: List[Dict[str, Any]],
+        model: str = "gpt-4.1-mini",
+        temperature: float = 0.3,
+) -> List[Dict[str, str] | None]:
+    """
+    Explain up to LLM_BATCH_SIZE rows with ONE chat completion, amortizing
+    the round trip and the system prompt across the rows.
+
+    Returns one {"explanation", "recommendation", "summary"} dict per
+    payload, in order; None for rows the model left out (caller decides
+    whether to retry them one by one). Request / JSON errors raise.
+    """
+
+    for payload in payloads:
+        validate_payload(payload)
+
+    messages = build_llm_multi_prompt(payloads)
+
+    response = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        response_format={"type": "json_object"},
+    )
+
+    parsed = json.loads(response.choices[0].message.content)
+
+    by_id = {
+        str(row.get("id")): row
+        for row in parsed.get("rows", [])
+        if isinstance(row, dict)
+    }
+
+    results: List[Dict[str, str] | None] = []
+    for k in range(len(payloads)):
+        row = by_id.get(str(k))
+        results.append(
+            None if row is None else {
+                "explanation": str(row.get("explanation", "")),
+                "recommendation": str(row.get("recommendation", "")),
+                "summary": str(row.get("summary", "")),
+            }
+        )
+
+    return results
+
+# ========================================================
+# STREAMING VARIANT (progressive rendering)
+# ========================================================
+def stream_llm_explanation(
+        client: OpenAI,
+        payload: Dict[str, Any],
+        model: str = "gpt-4.1-mini",
+        temperature: float = 0.3,
+) -> Iterator[str]:
+    """
+    Same prompt as generate_llm_explanation, but yields the answer text
+    chunk by chunk as the model produces it (e.g. for st.write_stream),
+    instead of waiting for the full completion.
+
+    Use _parse_llm_sections("".join(chunks)) for the structured dict.
+    """
+
+    validate_payload(payload)
+
+    messages = build_llm_prompt(payload)
+
+    try:
+        stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception:
+        yield _SYSTEM_ISSUE_TEXT
+
 # ========================================================
 # OPTIONAL: BATCH HELPER
 # ========================================================
+MAX_CONCURRENT_LLM_CALLS = 16
+
+def payload_key(payload: Dict[str, Any]) -> str:
+    """
+    Stable hash of a payload (canonical, key-sorted JSON).
+    Structurally identical payloads share a key.
+    """
+    canonical = json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+def _generate_llm_explanation_safe(
+        client: OpenAI,
+        payload: Dict[str, Any],
+        **kwargs,
+) -> Dict[str, str] | str:
+    """
+    generate_llm_explanation for one batch row: any failure becomes the
+    batch error text instead of sinking the whole batch.
+    """
+    try:
+        return generate_llm_explanation(client=client, payload=payload, **kwargs)
+    except Exception:
+        return _BATCH_ERROR_TEXT
+
 def generate_llm_explanations_batch(
         *,
         client: OpenAI,
         rows: List[Dict[str, Any]],
+        concurrency: int = MAX_CONCURRENT_LLM_CALLS,
         **kwargs,
-) -> List[str]:
+) -> List[Dict[str, str] | str]:
     """
     Batch-safe wrapper.
-    Returns one readable text block per row
-    """
+    Returns one explanation per row, in row order.
 
-    outputs: List[str] = []
-
-    for payload in rows:
-        try:
-            explanation = generate_llm_explanation(
-                client=client,
-                payload=payload,
-                **kwargs,
-            )
-        except Exception:
-            explanation = (
-                "What's happening:\n"
-                "LLM failed to generate explanation.\n\n"
-                "What to do:\n"
-                "Manual review required.\n\n"
-                "Summary:\n"
-                "LLM error."
-            )
-        outputs.append(explanation)
-    
-    return outputs
+    LLM calls are I/O-bound, so rows are sent from a thread pool through
+    the injected client (its pool is sized for MAX_CONCURRENT_LLM_CALLS).
+    Identical payloads are sent once and the answer is fanned back out
+    to every row that produced them.
+    """
+    keys = [payload_key(payload) for payload in rows]
+    unique: Dict[str, Dict[str, Any]] = {}
+    for key, payload in zip(keys, rows):
+        unique.setdefault(key, payload)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(unique)))) as pool:
+        results = list(pool.map(
+            lambda payload: _generate_llm_explanation_safe(client, payload, **kwargs),
+            unique.values(),
+        ))
+    cache = dict(zip(unique, results))
+
+    return [cache[key] for key in keys]
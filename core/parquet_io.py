@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+# =========================================
+# PARQUET WRITE SETTINGS (shared by the pipelines)
+# =========================================
+# zstd + dictionary pages: smaller files than the snappy default and
+# dictionary-encoded ids / names; 64k-row groups for pushdown on reads
+PARQUET_WRITE_OPTIONS = dict(
+    compression="zstd",
+    compression_level=3,
+    use_dictionary=True,
+    row_group_size=64_000,
+)
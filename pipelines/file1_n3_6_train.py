@@ -3,33 +3,49 @@
 from __future__ import annotations
 
 #import argparse
+import hashlib
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from joblib import Parallel, delayed
 
 # -------------------------------
 # Core pipeline modules
 # -------------------------------
-from core.n1_1_cleaning import (
-    clean_campaign_name,
-    extract_objective_dynamic,
-    normalize_objective,
+# cleaning is only used by the (disabled) stage 2 below
+# from core.n1_1_cleaning import (
+#     clean_campaign_name_series,
+#     extract_objective_dynamic_series,
+#     normalize_objective_series,
+# )
+
+from core.n2_1_supermetrics_ingestion import (
+    load_supermetrics_export,
+    code_fingerprint,
+    disk_memoize,
+    file_fingerprint,
 )
-
-from core.n2_1_supermetrics_ingestion import load_supermetrics_export
 # from core.n2_2_meta_ingestion import fetch_meta_daily_fact_table
 # from core.n2_3_merge import build_canonical_daily_df
 
 from core.n3_1_aggregation import aggregate_daily_campaign
 from core.n3_2_features import build_metric_features
 from core.n3_3_model import train_metric_model, save_model
+from core.parquet_io import PARQUET_WRITE_OPTIONS
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # ========================================================
 # MARK: STEP 11 — Predictions & Risk Flags (FINAL)
 # ========================================================
@@ -48,6 +64,8 @@ MIN_HISTORY_DAYS = int(os.getenv("MIN_HISTORY_DAYS", "7"))
 DEFAULT_TEST_DAYS = 14
 #DEFAULT_TARGET = "ctr_link"
 RANDOM_SEED = 42
+# retrain even when the models' key matches (e.g. after deleting data by hand)
+FORCE_RETRAIN = os.getenv("FORCE_RETRAIN", "false").lower() == "true"
 
 # Metrics we train (ONE model per metric)
 TARGETS = [
@@ -65,6 +83,17 @@ OUTPUT_DIR = Path("data/training")
 OUTPUT_CANONICAL = OUTPUT_DIR / "canonical_daily.parquet"
 OUTPUT_FEATURES = OUTPUT_DIR / "features.parquet"
 MODEL_DIR = Path("artifacts/models")
+MODELS_KEY = MODEL_DIR / "models.key"
+CACHE_DIR = OUTPUT_DIR / "_cache"
+
+# features.parquet is written one row group per campaign bucket, so
+# per-campaign readers can push a filter down and skip the other groups
+FEATURE_BUCKETS = 16
+BUCKET_COL = "_bucket"
+
+# Parsed export cached as Parquet, keyed on the file's fingerprint:
+# retraining on the same export skips the CSV / Excel decode
+load_supermetrics_cached = disk_memoize(CACHE_DIR)(load_supermetrics_export)
 
 
 # ========================================================
@@ -78,6 +107,133 @@ def require_env(name: str) -> str:
 
 if not SUPER_METRICS_PATH or not DATE_SINCE:
     raise RuntimeError("Missing required env vars: SUPER_METRICS_PATH or DATE_SINCE")
+
+# ========================================================
+# STAGE CACHE (skip unchanged stages on re-runs)
+# ========================================================
+class StageCache:
+    """
+    Reuse a stage's Parquet artifact when the stage's inputs are unchanged.
+
+    key = hash of everything the output depends on (upstream key, params,
+    code). It is stored next to the artifact as <artifact>.key.
+    """
+
+    def __init__(self, artifact: Path, *parts: object) -> None:
+        self.artifact = artifact
+        self.key_path = artifact.with_suffix(".key")
+        self.key = hashlib.blake2b(
+            "|".join(map(str, parts)).encode(), digest_size=16
+        ).hexdigest()
+
+    def load(self, columns: list[str] | None = None) -> pd.DataFrame | None:
+        """
+        Cached artifact (optionally only `columns`), or None on a key miss.
+        """
+        if (
+            self.artifact.exists()
+            and self.key_path.exists()
+            and self.key_path.read_text() == self.key
+        ):
+            # return pd.read_parquet(self.artifact)
+            return (
+                pq.read_table(self.artifact, columns=columns, use_threads=True)
+                .to_pandas(self_destruct=True, split_blocks=True)
+            )
+        return None
+
+    def save(self, df: pd.DataFrame, bucket_by: str | None = None) -> None:
+        """
+        Write the artifact. With bucket_by, rows are grouped by
+        campaign_bucket(df[bucket_by]) and each bucket becomes its own
+        row group, tagged in BUCKET_COL (df itself is not modified).
+        """
+        # drop the old key first: an interrupted write leaves no key,
+        # so it never looks like a valid cache hit
+        self.key_path.unlink(missing_ok=True)
+
+        if bucket_by is None:
+            df.to_parquet(self.artifact, index=False, **PARQUET_WRITE_OPTIONS)
+        else:
+            buckets = campaign_bucket(df[bucket_by])
+            order = np.argsort(buckets, kind="stable")
+            table = (
+                pa.Table.from_pandas(df, preserve_index=False)
+                .append_column(BUCKET_COL, pa.array(buckets))
+                .take(order)
+            )
+            bounds = np.searchsorted(buckets[order], np.arange(FEATURE_BUCKETS + 1))
+            # row_group_size is a per-write option: a large bucket may span
+            # several row groups, but a row group never mixes buckets
+            write_options = dict(PARQUET_WRITE_OPTIONS)
+            row_group_size = write_options.pop("row_group_size")
+            with pq.ParquetWriter(self.artifact, table.schema, **write_options) as writer:
+                for lo, hi in zip(bounds[:-1], bounds[1:]):
+                    if hi > lo:
+                        writer.write_table(
+                            table.slice(lo, hi - lo), row_group_size=row_group_size
+                        )
+        # key last, only once the artifact is complete
+        self.key_path.write_text(self.key)
+
+def campaign_bucket(campaign_ids) -> np.ndarray:
+    """
+    Stable bucket (0..FEATURE_BUCKETS-1) per campaign id.
+    Hashes the id text, not category codes, so a bucket never
+    depends on which other campaigns are in the frame.
+
+    Readers: pq.read_table(OUTPUT_FEATURES,
+                           filters=[(BUCKET_COL, "==", campaign_bucket([cid])[0])])
+    """
+    ids = np.asarray(campaign_ids, dtype=object).astype(str)
+    return (pd.util.hash_array(ids) % FEATURE_BUCKETS).astype(np.int8)
+
+def training_columns(path: Path) -> list[str]:
+    """
+    Columns train_metric_model can use, read from the Parquet schema only:
+    date, campaign_id and every numeric column (features + targets).
+    Labels, statuses, campaign dates and BUCKET_COL are never decoded.
+    """
+    return [
+        f.name for f in pq.read_schema(path)
+        if f.name != BUCKET_COL
+        and (
+            f.name in ("date", "campaign_id")
+            or pa.types.is_integer(f.type)
+            or pa.types.is_floating(f.type)
+            or pa.types.is_boolean(f.type)
+        )
+    ]
+
+# Parquet encoding releases the GIL -> artifact writes run on a background
+# thread while the next stage computes (joined before the pipeline returns)
+io_pool = ThreadPoolExecutor(max_workers=2)
+# ========================================================
+# PER-TARGET TRAINING (one worker task)
+# ========================================================
+def _train_and_save(df: pd.DataFrame, target: str, out_dir: Path, n_threads: int) -> str:
+    """
+    Train ONE metric model and write its artifacts.
+    Module-level so joblib worker processes can import it.
+    Returns the target; the parent logs it (loky workers have no
+    logging handler configured).
+    """
+    model, metadata = train_metric_model(
+        df,
+        target=target,
+        test_days=DEFAULT_TEST_DAYS,
+        random_seed=RANDOM_SEED,
+        n_jobs=n_threads,
+    )
+
+    save_model(
+        model,
+        metadata,
+        out_dir / target,
+    )
+
+    return target
+
 # ========================================================
 # MAIN TRAINING PIPELINE
 # ========================================================
@@ -105,25 +261,53 @@ def run_training(
 
     This pipeline:
     ✔ Trains a new model
-    ✔ Overwrites existing artifacts
+    ✔ Overwrites existing artifacts (skipped when MODELS_KEY still matches,
+      unless FORCE_RETRAIN=true)
     ✖ does not run daily
     ✖ does not call LLM
     ✖ does not generate alerts
     """
 
-    print("\n==============================")
-    print("🚀 METRIC TRAINING PIPELINE START")
-    print("==============================")
+    logger.info("🚀 METRIC TRAINING PIPELINE START")
+
+    # Nothing to do if every model was trained from the same export,
+    # params and code (MODELS_KEY is written only after all of them)
+    models_key = StageCache(
+        MODELS_KEY,
+        file_fingerprint(Path(supermetrics_path)),
+        min_history_days,
+        TARGETS,
+        DEFAULT_TEST_DAYS,
+        RANDOM_SEED,
+        code_fingerprint(load_supermetrics_export),
+        code_fingerprint(aggregate_daily_campaign),
+        code_fingerprint(build_metric_features),
+        code_fingerprint(train_metric_model),
+        code_fingerprint(_train_and_save),
+    ).key
+    if (
+        not FORCE_RETRAIN
+        and MODELS_KEY.exists()
+        and MODELS_KEY.read_text() == models_key
+        and all((MODEL_DIR / t).with_suffix(".joblib").exists() for t in TARGETS)
+    ):
+        logger.info("⏭️ No-op: models already trained from this export, params and code.")
+        return
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     MODEL_DIR.mkdir(parents=True, exist_ok=True)
+
+    MODELS_KEY.unlink(missing_ok=True)
+
+    pending = []  # background artifact writes
     #model_path.parent.mkdir(parents=True, exist_ok=True)
 
     # -------------------------------------------------
     # 0. INGEST — Supermetrics (authoritative metrics)
     # -------------------------------------------------
-    print("[0/6] Loading Supermetrics export...")
-    df_super = load_supermetrics_export(supermetrics_path)
+    logger.info("[0/6] Loading Supermetrics export...")
+    # df_super = load_supermetrics_export(supermetrics_path)
+    df_super = load_supermetrics_cached(supermetrics_path)
 
     if df_super.empty:
         raise RuntimeError("Supermetrics export is empty.")
@@ -159,93 +343,131 @@ def run_training(
     # # --------------------------------------------------
     # # 2. CLEANING / ONTOLOGY
     # # --------------------------------------------------
-    # print(["[2/6] Cleaning campaign semantics..."])
+    # logger.info("[2/6] Cleaning campaign semantics...")
 
     # if "campaign_name" in df.columns:
-    #     df["campaign_name_clean"] = df["campaign_name"].apply(clean_campaign_name)
-    #     df["objective_raw"] = df["campaign_name_clean"].apply(
-    #         extract_objective_dynamic
+    #     # whole-column string ops instead of one Python call per row
+    #     df["campaign_name_clean"] = clean_campaign_name_series(df["campaign_name"])
+    #     df["objective_raw"] = extract_objective_dynamic_series(
+    #         df["campaign_name_clean"]
     #     )
-    #     df["objective"] = df["objective_raw"].apply(normalize_objective)
+    #     df["objective"] = normalize_objective_series(df["objective_raw"])
 
     # # --------------------------------------------------
     # 3. AGGREGATION (DAILY x CAMPAIGN)
     # --------------------------------------------------
-    print("[3/6] Aggregating daily campaign data...")
-    df_daily = aggregate_daily_campaign(df_super)
-    #df_daily = aggregate_daily_campaign(df)
+    logger.info("[3/6] Aggregating daily campaign data...")
+    stage3 = StageCache(
+        OUTPUT_CANONICAL,
+        file_fingerprint(Path(supermetrics_path)),
+        code_fingerprint(load_supermetrics_export),
+        code_fingerprint(aggregate_daily_campaign),
+    )
+    df_daily = stage3.load()
 
-    if df_daily.empty:
-        raise RuntimeError("Aggregation resulted in empty DataFrame.")
+    if df_daily is not None:
+        logger.info("    ↺ inputs unchanged, reusing canonical_daily.parquet")
+    else:
+        df_daily = aggregate_daily_campaign(df_super)
+        #df_daily = aggregate_daily_campaign(df)
 
-    df_daily.to_parquet(OUTPUT_CANONICAL, index=False)
+        if df_daily.empty:
+            raise RuntimeError("Aggregation resulted in empty DataFrame.")
+
+        # df_daily.to_parquet(OUTPUT_CANONICAL, index=False)
+        pending.append(io_pool.submit(stage3.save, df_daily))
     
     # --------------------------------------------------
     # 4. FEATURE ENGINEERING
     # --------------------------------------------------
     #print("[4/6] Building CTR features...")
-    print("[4/6] Building features...")
-    df_features = build_metric_features(
-        df_daily,
-        min_history_days=min_history_days,
+    logger.info("[4/6] Building features...")
+    stage4 = StageCache(
+        OUTPUT_FEATURES,
+        stage3.key,
+        min_history_days,
+        code_fingerprint(build_metric_features),
+    )
+    # reload pruned to what training reads (numeric features + keys)
+    df_features = (
+        stage4.load(columns=training_columns(OUTPUT_FEATURES))
+        if OUTPUT_FEATURES.exists() else None
     )
 
-    if df_features.empty:
-        raise RuntimeError("Feature engineering resulted in empty DataFrame.")
-    
-    df_features.to_parquet(OUTPUT_FEATURES, index=False)
+    if df_features is not None:
+        logger.info("    ↺ inputs unchanged, reusing features.parquet")
+    else:
+        df_features = build_metric_features(
+            df_daily,
+            min_history_days=min_history_days,
+        )
+
+        if df_features.empty:
+            raise RuntimeError("Feature engineering resulted in empty DataFrame.")
+
+        # Engineered features already come out float32; anything still 64-bit
+        # (future columns) is narrowed too: half the bytes on disk and into XGBoost
+        wide_floats = df_features.select_dtypes("float64").columns
+        df_features[wide_floats] = df_features[wide_floats].astype(np.float32)
+        wide_ints = df_features.select_dtypes("int64").columns
+        df_features[wide_ints] = df_features[wide_ints].astype(np.int32)
+        
+        # df_features.to_parquet(OUTPUT_FEATURES, index=False)
+        pending.append(
+            io_pool.submit(stage4.save, df_features, bucket_by="campaign_id")
+        )
     
     # ---------------------------------------------------
     # 5. MODEL TRAINING
     # ---------------------------------------------------
-    print("[5/6] Training metric model...")
+    logger.info("[5/6] Training metric model...")
 
+    targets = []
     for target in TARGETS:
         if target not in df_features.columns:
-            print(f"⚠️ Skipping {target}: column not found")
+            logger.warning("⚠️ Skipping %s: column not found", target)
             continue
+        targets.append(target)
+
+    # Shared prep done once for every target: chronological order
+    # (train_metric_model then skips its own copy + sort)
+    df_features = df_features.sort_values("date", kind="mergesort")
+
+    # Targets are independent and CPU-bound -> one process per target,
+    # and the cores split between them: each fit gets an explicit
+    # XGBoost thread count (loky would otherwise cap a worker's inner
+    # threads on its own). max_nbytes="1M": df_features' column arrays
+    # are dumped once to a memmap the workers share, not pickled per task.
+    n_cores = os.cpu_count() or 1
+    n_workers = max(1, min(len(targets), n_cores))
+    n_threads = max(1, n_cores // n_workers)
+
+    # =============================================
+    # 6. SAVE ARTIFACTS (inside each task)
+    # ============================================
+    done = Parallel(
+        n_jobs=n_workers,
+        backend="loky",
+        batch_size=1,
+        max_nbytes="1M",
+        return_as="generator",
+    )(
+        delayed(_train_and_save)(df_features, target, MODEL_DIR, n_threads)
+        for target in targets
+    )
+    for target in done:
+        logger.info("🧠 Trained model for: %s", target)
 
-        print(f"\n🧠 Training model for: {target}")
-
-        model, metadata = train_metric_model(
-            df_features,
-            #target=DEFAULT_TARGET,
-            target=target,
-            test_days=DEFAULT_TEST_DAYS,
-            random_seed=RANDOM_SEED,
-            
-        )
-        # =============================================
-        # 6. SAVE ARTIFACTS
-        # ============================================
-        save_model(
-            model,
-            metadata,
-            MODEL_DIR / target,
-        )
+    # surface any write error before reporting success
+    for fut in pending:
+        fut.result()
+    MODELS_KEY.write_text(models_key)
     
-    print("\n==============================")
-    print("✅ TRAINING COMPLETE")
-    print("==============================")
-    print(f"📦 Models saved to: {MODEL_DIR.resolve()}")
-    print(f"🧠 Targets trained: {TARGETS}")    
-        #model_path.parent.mkdir(parents=True, exist_ok=True)
-    """
-    # ---------------------------------------------------
-    # 6. SAVE ARTIFACTS
-    # ---------------------------------------------------
-    print("[6/6] Saving model artifacts...")
-    save_model(model, metadata, str(model_path))
-
-    # print("\n✅ Training complete")
-    # print(f"Model saved to: {model_path}")
-    # print(f"Metrics: {metadata['metrics']}")
-
-    print("\n✅ TRAINING COMPLETE")
-    print(f"📦 Model path: {model_path.resolve()}")
-    print(f"📊 Metrics: {metadata['metrics']}")
-    print(f"🧠 Features used: {len(metadata['features'])}")
-    """
+    logger.info("✅ TRAINING COMPLETE")
+    if logger.isEnabledFor(logging.INFO):
+        # resolve() touches the filesystem: only pay for it when it is shown
+        logger.info("📦 Models saved to: %s", MODEL_DIR.resolve())
+    logger.info("🧠 Targets trained: %s", targets)
 
 
 # ====================================================
@@ -253,6 +475,11 @@ def run_training(
 # ====================================================
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="%(asctime)s %(message)s",
+    )
+
     # parser = argparse.ArgumentParser(description="Metric Model Training Pipeline")
 
     # parser.add_argument(
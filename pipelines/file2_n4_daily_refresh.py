@@ -3,12 +3,20 @@
 from __future__ import annotations
 
 #import argparse
+import hashlib
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timezone
 from tqdm import tqdm
 
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from joblib import Parallel, delayed
 
 # -------------------------------
 # Core pipeline modules
@@ -19,7 +27,11 @@ from core.n1_1_cleaning import (
     normalize_objective,
 )
 
-from core.n2_1_supermetrics_ingestion import load_supermetrics_export
+from core.n2_1_supermetrics_ingestion import (
+    load_supermetrics_export_memo,
+    code_fingerprint,
+    file_fingerprint,
+)
 # from core.n2_2_meta_ingestion import fetch_meta_daily_fact_table
 # from core.n2_3_merge import build_canonical_daily_df
 
@@ -29,9 +41,13 @@ from core.n3_3_model import load_model, predict_ctr
 from core.n3_4_rules import generate_signals
 
 from core.n3_5_llm import (
+    LLM_BATCH_SIZE,
     get_openai_client,
     generate_llm_explanation,
+    generate_llm_explanations_multi,
+    payload_key,
 )
+from core.parquet_io import PARQUET_WRITE_OPTIONS
 
 from dotenv import load_dotenv
 
@@ -57,9 +73,29 @@ OUTPUT_CANONICAL = OUTPUT_DIR / "canonical_daily.parquet"
 OUTPUT_FEATURES = OUTPUT_DIR / "features.parquet"
 OUTPUT_PREDICTIONS = OUTPUT_DIR / "predictions.parquet"
 OUTPUT_ALERTS = OUTPUT_DIR / "alerts.parquet"
+# inputs key of the run that wrote the outputs above (written last)
+OUTPUT_KEY = OUTPUT_DIR / "predictions.key"
+
+# text keys the dashboard groups / filters on: written as dictionary
+# columns so pages read them back as category without re-encoding
+CATEGORY_COLS = ("client", "campaign_id", "campaign_name", "objective", "result_category")
+
+# dashboard read order: rows sorted on these keys keep each row group's
+# min / max tight, so campaign / date filters skip whole row groups.
+# The refresh does not produce `client` (the export has no such column);
+# keys missing from the output are dropped, so today the order is
+# (campaign_id, date) and `client` only leads once an upstream adds it
+SORT_KEYS = ("client", "campaign_id", "date")
+
+# whole-number counts: int32 on disk when fully populated (float32 is
+# the same width but stops being exact above 2**24)
+COUNT_COLS = ("impressions", "clicks", "clicks_all", "actions", "retargeting_pool", "result_value")
 
 META_CHECKPOINT = Path("data/raw/meta.parquet")
 
+# LLM answers keyed by payload hash: same-day reruns skip the API
+LLM_CACHE = Path("data/cache/llm_explanations.parquet")
+
 # ===================================================
 # LLM CONFIG (ENV-DRIVEN)
 # ===================================================
@@ -67,6 +103,20 @@ ENABLE_LLM = os.getenv("ENABLE_LLM", "true").lower() == "true"
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4.1-mini")
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.3"))
 
+# Concurrent LLM requests (bounded to stay under the API rate limit)
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "8"))
+
+# Metrics whose signals are explained to the LLM
+LLM_METRICS = [
+    "ctr_link",
+    "ctr_all",
+    "cpc_link",
+    "cpc_all",
+    "cpa",
+    "cpm",
+    "cost_per_1000_reach",
+]
+
 # ===================================================
 # ENV HELPERS
 # ===================================================
@@ -79,6 +129,172 @@ def require_env(name: str) -> str:
 if not SUPER_METRICS_PATH or not DATE_SINCE:
     raise RuntimeError("Missing required env vars for daily refresh")
 
+# ===================================================
+# RUN KEY (skip refreshes whose inputs are unchanged)
+# ===================================================
+def _refresh_key(
+        supermetrics_path: Path,
+        model_dir: Path,
+        min_history_days: int,
+        llm_enabled: bool,
+) -> str:
+    """
+    Hash of everything the outputs depend on: the export's content
+    fingerprint, every model artifact, the run settings and the code
+    (ingestion, aggregation, features, prediction, rules, LLM prompt, this pipeline).
+    """
+    parts = [
+        file_fingerprint(supermetrics_path),
+        *(
+            file_fingerprint(p)
+            for p in sorted(model_dir.glob("*.joblib")) + sorted(model_dir.glob("*.json"))
+        ),
+        str(min_history_days),
+        str(llm_enabled),
+        LLM_MODEL,
+        str(LLM_TEMPERATURE),
+        code_fingerprint(load_supermetrics_export_memo),
+        code_fingerprint(aggregate_daily_campaign),
+        code_fingerprint(build_metric_features),
+        code_fingerprint(predict_ctr),
+        code_fingerprint(generate_signals),
+        code_fingerprint(generate_llm_explanation),
+        code_fingerprint(_refresh_key),
+    ]
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+# ===================================================
+# DTYPE HELPERS
+# ===================================================
+def _narrow_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    float64 -> float32 and int64 -> int32 (flags are already int8).
+    """
+    wide_floats = df.select_dtypes("float64").columns
+    wide_ints = df.select_dtypes("int64").columns
+    if len(wide_floats) or len(wide_ints):
+        df = df.astype({
+            **{c: np.float32 for c in wide_floats},
+            **{c: np.int32 for c in wide_ints},
+        })
+    return df
+
+def _int_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    COUNT_COLS stored as float -> int32, unless they hold NaN.
+    """
+    cols = {
+        c: np.int32
+        for c in COUNT_COLS
+        if c in df.columns
+        and df[c].dtype.kind == "f"
+        and not df[c].isna().any()
+    }
+    return df.astype(cols) if cols else df
+
+def _sort_indices(table: pa.Table, sort_keys: list[tuple[str, str]]) -> pa.Array:
+    """
+    Row order for sort_keys. Arrow cannot sort dictionary columns (the
+    category keys), so those are compared on their decoded values.
+    """
+    keys = {}
+    for col, _ in sort_keys:
+        values = table[col]
+        if pa.types.is_dictionary(values.type):
+            values = values.cast(values.type.value_type)
+        keys[col] = values
+
+    return pc.sort_indices(pa.table(keys), sort_keys=sort_keys)
+
+def _write_table_atomic(table: pa.Table, path: Path, sorting_columns) -> None:
+    """
+    Write to a temp file next to `path`, then os.replace it into place.
+    The dashboard memory-maps these files: a reader keeps the old (intact)
+    file while the refresh writes, instead of seeing it truncated.
+    """
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    pq.write_table(
+        table,
+        tmp,
+        sorting_columns=sorting_columns,
+        **PARQUET_WRITE_OPTIONS,
+    )
+    os.replace(tmp, path)
+
+def _categorize(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    CATEGORY_COLS present as text -> category.
+    """
+    cols = {
+        c: "category"
+        for c in CATEGORY_COLS
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype)
+    }
+    return df.astype(cols) if cols else df
+
+# ===================================================
+# LLM HELPERS
+# ===================================================
+def _explain(client, payload: dict) -> tuple[str, str, str]:
+    """
+    One alert row -> (explanation, recommendation, summary).
+    Never raises, so one failed row cannot sink the worker pool.
+    """
+    try:
+        text = generate_llm_explanation(
+            client=client,
+            payload=payload,
+        )
+        return text["explanation"], text["recommendation"], text["summary"]
+
+    except Exception as e:
+        print(f"LLM failed to generate explanation for {payload.get('campaign_name')}.")
+        print(e)
+        return "", "", "LLM error."
+
+def _load_llm_cache(path: Path) -> dict[str, tuple[str, str, str]]:
+    """
+    payload_key -> (explanation, recommendation, summary); {} if unreadable.
+    """
+    if not path.exists():
+        return {}
+    try:
+        df = pd.read_parquet(path)
+    except Exception:
+        return {}
+    return dict(zip(
+        df["key"],
+        zip(df["explanation"], df["recommendation"], df["summary"]),
+    ))
+
+def _save_llm_cache(path: Path, cache: dict[str, tuple[str, str, str]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(
+        [(key, *texts) for key, texts in cache.items()],
+        columns=["key", "explanation", "recommendation", "summary"],
+    ).to_parquet(path, index=False)
+
+def _explain_batch(client, payloads: list[dict]) -> list[tuple[str, str, str]]:
+    """
+    Several alert rows in one request; rows the model skipped (or a
+    failed batch) fall back to one request per row.
+    """
+    try:
+        texts = generate_llm_explanations_multi(
+            client=client,
+            payloads=payloads,
+        )
+    except Exception as e:
+        print(f"LLM batch of {len(payloads)} rows failed, retrying row by row.")
+        print(e)
+        texts = [None] * len(payloads)
+
+    return [
+        (text["explanation"], text["recommendation"], text["summary"])
+        if text is not None else _explain(client, payload)
+        for text, payload in zip(texts, payloads)
+    ]
+
 # ===================================================
 # DAILY REFRESH PIPELINE
 # ===================================================
@@ -127,6 +343,20 @@ def run_daily_refresh(
         else:
             client = get_openai_client(api_key)
 
+    # Same export, models, settings and code -> the outputs already on
+    # disk are what this run would write: nothing to recompute
+    run_key = _refresh_key(
+        Path(supermetrics_path), Path(model_path), min_history_days, llm_enabled,
+    )
+    if (
+        OUTPUT_PREDICTIONS.exists()
+        and OUTPUT_ALERTS.exists()
+        and OUTPUT_KEY.exists()
+        and OUTPUT_KEY.read_text() == run_key
+    ):
+        print("⏭️ No-op: export, models, settings and code unchanged since the last refresh.")
+        return
+
     #total_steps = 8
 
     steps = [
@@ -138,13 +368,20 @@ def run_daily_refresh(
         "Apply rules",
         "Write outputs",
     ]
-    pbar = tqdm(total=len(steps), desc="Pipeline", unit="step")
+    # no redraw / flush per step when stderr is a log file or pipe
+    pbar = tqdm(
+        total=len(steps),
+        desc="Pipeline",
+        unit="step",
+        disable=not sys.stderr.isatty(),
+    )
 
     # -------------------------------------------------
     # 0. INGEST — Supermetrics (authoritative metrics)
     # -------------------------------------------------
     print("[0/8] Loading Supermetrics export...")
-    df_super = load_supermetrics_export(supermetrics_path)
+    # df_super = load_supermetrics_export(supermetrics_path)
+    df_super = load_supermetrics_export_memo(supermetrics_path)
 
     if df_super.empty:
         raise RuntimeError("Supermetrics export is empty.")
@@ -240,8 +477,12 @@ def run_daily_refresh(
 
     if df_features.empty:
         raise RuntimeError("Feature engineering resulted in empty DataFrame.")
+
+    # Same narrowing as training, so the models see the dtypes they were
+    # fit on (float32) and every later pass moves half the bytes
+    df_features = _narrow_numeric(df_features)
     
-    df_features.to_parquet(OUTPUT_FEATURES, index=False)
+    df_features.to_parquet(OUTPUT_FEATURES, index=False, **PARQUET_WRITE_OPTIONS)
     pbar.update(1)
     
     # ----------------------------------------------------
@@ -254,16 +495,19 @@ def run_daily_refresh(
     if not model_dir.exists():
         raise RuntimeError(f"Model directory not found: {model_dir}")
 
-    models = {}
+    metrics = sorted(f.stem for f in model_dir.glob("*.joblib"))
 
-    for model_file in model_dir.glob("*.joblib"):
-        metric = model_file.stem
+    if not metrics:
+        raise RuntimeError("No trained models found in model directory.")
+
+    for metric in metrics:
         print(f"↪ Loading model for {metric}")
-        model, metadata = load_model(model_dir / metric)
-        models[metric] = (model, metadata)
 
-    if not models:
-        raise RuntimeError("No trained models found in model directory.")
+    # independent files; decompression runs outside the GIL -> threads
+    loaded = Parallel(n_jobs=min(4, len(metrics)), prefer="threads")(
+        delayed(load_model)(model_dir / metric) for metric in metrics
+    )
+    models = dict(zip(metrics, loaded))
 
     pbar.update(1)
 
@@ -272,13 +516,41 @@ def run_daily_refresh(
     # -----------------------------------------------------
     print("[6/8] Predicting metrics...")
 
-    for metric, (model, metadata) in models.items():
-        df_features[f"pred_{metric}"] = predict_ctr(
+    # The models share most features: build ONE float32 matrix over the
+    # union of their feature lists, then hand each model its columns by
+    # position (no per-model label lookup / dtype conversion)
+    feature_union = list(dict.fromkeys(
+        c for _, metadata in models.values() for c in metadata["features"]
+    ))
+    missing = set(feature_union) - set(df_features.columns)
+    if missing:
+        raise ValueError(f"Missing feature columns in input DataFrame: {missing}")
+
+    X_all = np.ascontiguousarray(
+        df_features[feature_union].to_numpy(dtype=np.float32, na_value=np.nan)
+    )
+    X_all[np.isinf(X_all)] = np.nan
+    feature_pos = {c: i for i, c in enumerate(feature_union)}
+
+    specs = [
+        (metric, model, metadata["features"], [feature_pos[c] for c in metadata["features"]])
+        for metric, (model, metadata) in models.items()
+    ]
+
+    # Models run one after another: each XGBoost predict already uses
+    # every core (threads per model would oversubscribe the CPU). All
+    # pred_* columns then join df_features in a single concat
+    preds = [
+        predict_ctr(
             model=model,
             df=df_features,
-            feature_cols=metadata["features"],
+            feature_cols=features,
             output_name=f"pred_{metric}",
+            X=X_all[:, idx],
         )
+        for metric, model, features, idx in specs
+    ]
+    df_features = pd.concat([df_features, *preds], axis=1)
 
     pbar.update(1)
 
@@ -293,71 +565,146 @@ def run_daily_refresh(
     # -------------------------------------------------------
     # 7.5 LLM EXPLANATIONS (Human-readable layer)
     # -------------------------------------------------------
-    if llm_enabled:
+    has_signal = df_out["has_signal"].to_numpy(dtype=bool)
+
+    if llm_enabled and not has_signal.any():
+        # Quiet day: nothing to explain -> no payloads, cache read or pool
+        print("[7.5/8] No alerts, skipping LLM explanations.")
+        df_out["llm_explanation"] = ""
+        df_out["llm_recommendation"] = ""
+        df_out["llm_summary"] = "Performance is stable."
+
+    elif llm_enabled:
         print("[7.5/8] Generating LLM explanations...")
 
         #llm_client = get_openai_client(os.getenv("OPENAI_API_KEY"))
 
         # reasons = []
-        explanations = []
-        recommendations = []
-        summaries = []
-
         # llm_texts = []
 
-        for _, row in df_out.iterrows():
-            # Only explain rows with actual signals
-            if row.get("signal_count", 0) == 0:
-                # reasons.append("")
-                explanations.append("")
-                recommendations.append("")
-                summaries.append("Performance is stable.")
-                #llm_texts.append("")
-                continue
-            
-            payload = {
-                "campaign_id": row.get("campaign_id"),
-                "campaign_name": row.get("campaign_name"),
-                "date": str(row.get("date")),
-                "overall_severity": row["max_severity"],
-                "signals": {
-                    metric: {
-                        "severity": row[f"{metric}_severity"],
-                        "ratio": round(row[f"{metric}_ratio"], 2),
-                        "actual": round(row[metric], 4),
-                        "predicted": round(row[f"pred_{metric}"], 4),
-                    }
-                    for metric in [
-                        "ctr_link",
-                        "ctr_all",
-                        "cpc_link",
-                        "cpc_all",
-                        "cpa",
-                        "cpm",
-                        "cost_per_1000_reach",
-                    ]
-                    if f"{metric}_flag" in row and row[f"{metric}_flag"] == 1
+        # Baseline for every row in one pass; only rows with actual
+        # signals are visited below (no iterrows over the full frame)
+        explanations = np.full(len(df_out), "", dtype=object)
+        recommendations = np.full(len(df_out), "", dtype=object)
+        summaries = np.where(has_signal, "", "Performance is stable.").astype(object)
+
+        metrics = [m for m in LLM_METRICS if f"{m}_flag" in df_out.columns]
+        alert_rows = np.flatnonzero(has_signal)
+
+        # Column name -> position map, resolved ONCE per run (no per-row
+        # f-strings or label hashing): field -> positions in metric order
+        positions = {
+            field: df_out.columns.get_indexer([pattern.format(m) for m in metrics])
+            for field, pattern in (
+                ("flag", "{}_flag"),
+                ("severity", "{}_severity"),
+                ("ratio", "{}_ratio"),
+                ("actual", "{}"),
+                ("pred", "pred_{}"),
+            )
+        }
+
+        # get_indexer marks a missing column -1 (= last column for iloc)
+        missing = [f for f, pos in positions.items() if (pos < 0).any()]
+        if missing:
+            raise KeyError(f"Signal columns missing for LLM payloads: {missing}")
+
+        # Column-major pulls over the alert rows only: one 2-D positional
+        # take per field, rounded once; the loop below just indexes
+        def block(field, dtype=object):
+            return df_out.iloc[alert_rows, positions[field]].to_numpy(dtype=dtype)
+
+        def column(col, default=""):
+            # always a full list, NA already replaced: the loop indexes it
+            # positionally with no per-row .get / isna checks, and the JSON
+            # sent to the LLM never carries NaN for a missing label
+            if col not in df_out.columns:
+                return [default] * len(alert_rows)
+            values = df_out[col].to_numpy(dtype=object)[alert_rows]
+            values[pd.isna(values)] = default
+            return values.tolist()
+
+        flags = block("flag", dtype=np.float64) == 1
+        severities = block("severity").tolist()
+        ratios = np.round(block("ratio", np.float64), 2).tolist()
+        actuals = np.round(block("actual", np.float64), 4).tolist()
+        predicted = np.round(block("pred", np.float64), 4).tolist()
+
+        campaign_ids = column("campaign_id")
+        campaign_names = column("campaign_name")
+        # formatted once for all alert rows, not str(Timestamp) per row
+        dates = (
+            df_out["date"].iloc[alert_rows].dt.strftime("%Y-%m-%d").tolist()
+            if "date" in df_out.columns else [None] * len(alert_rows)
+        )
+        overall = df_out["max_severity"].to_numpy(dtype=object)[alert_rows].tolist()
+
+        # Active metric positions for ALL alert rows in one nonzero() sweep,
+        # stored ragged as a flat list + per-row offsets (row r owns
+        # active[offsets[r]:offsets[r + 1]]) instead of a numpy call per row
+        flag_rows, flag_metrics = np.nonzero(flags)
+        offsets = np.r_[0, np.cumsum(np.bincount(flag_rows, minlength=len(alert_rows)))].tolist()
+        active = flag_metrics.tolist()
+
+        payloads = []
+        for r in range(len(alert_rows)):
+            signals = {
+                metrics[j]: {
+                    "severity": severities[r][j],
+                    "ratio": ratios[r][j],
+                    "actual": actuals[r][j],
+                    "predicted": predicted[r][j],
                 }
+                for j in active[offsets[r] : offsets[r + 1]]
             }
 
-            try:
-                text = generate_llm_explanation(
-                    #client=llm_client,
-                    client=client,
-                    payload=payload,
-                )
-
-                explanations.append(text["explanation"])
-                recommendations.append(text["recommendation"])
-                summaries.append(text["summary"])
-
-            except Exception as e:
-                print(f"LLM failed to generate explanation for {row['campaign_name']}.")
-                print(e)
-                explanations.append("")
-                recommendations.append("")
-                summaries.append("LLM error.")
-            
+            payloads.append({
+                "campaign_id": campaign_ids[r],
+                "campaign_name": campaign_names[r],
+                "date": dates[r],
+                "overall_severity": overall[r],
+                # validate_payload contract
+                "metrics_flagged": list(signals),
+                "signals": signals,
+            })
+
+        # Identical payloads (this run or a cached earlier one) go to the
+        # API once; only new keys are sent
+        cache = _load_llm_cache(LLM_CACHE)
+        keys = [payload_key(p) for p in payloads]
+        todo: dict[str, dict] = {}
+        for key, payload in zip(keys, payloads):
+            if key not in cache:
+                todo.setdefault(key, payload)
+        pending = list(todo.values())
+
+        # LLM_BATCH_SIZE rows per request (one round trip + one system
+        # prompt for the batch). Calls are network-bound (the GIL is
+        # released while waiting on HTTP), so batches overlap on a pool;
+        # map() keeps results in payload order
+        batches = [
+            pending[k : k + LLM_BATCH_SIZE]
+            for k in range(0, len(pending), LLM_BATCH_SIZE)
+        ]
+        with ThreadPoolExecutor(max_workers=LLM_WORKERS) as pool:
+            fresh = dict(zip(todo, (
+                result
+                for batch in pool.map(lambda b: _explain_batch(client, b), batches)
+                for result in batch
+            )))
+
+        # failed rows are not cached: they are retried on the next run
+        if fresh:
+            cache.update({k: v for k, v in fresh.items() if v[2] != "LLM error."})
+            _save_llm_cache(LLM_CACHE, cache)
+
+        results = [fresh[k] if k in fresh else cache[k] for k in keys]
+
+        for i, (explanation, recommendation, summary) in zip(alert_rows, results):
+            explanations[i] = explanation
+            recommendations[i] = recommendation
+            summaries[i] = summary
+
         df_out["llm_explanation"] = explanations
         df_out["llm_recommendation"] = recommendations
         df_out["llm_summary"] = summaries
@@ -454,27 +801,37 @@ def run_daily_refresh(
     # -------------------------------------------------------
     print(["[8/8] Writing outputs..."])
 
-    # Full predictions
-    # full_path = OUTPUT_DIR / "daily_predictions_latest.csv"
-    # df_out.to_csv(full_path, index=False)
+    # predictions / rule columns added since step 4 (e.g. pred_* when a
+    # model returns float64, day counters) -> 32-bit on disk too
+    df_out = _narrow_numeric(df_out)
+    df_out = _int_counts(df_out)
+    df_out = _categorize(df_out)
 
-    # # Alerts-only view
-    # alerts = df_out[df_out["alert_msg"] != ""]
-    # alerts_path = OUTPUT_DIR / "daily_alerts_latest.csv"
-    # alerts.to_csv(alerts_path, index=False)
+    # ONE pandas -> Arrow conversion feeds both files; the alerts view is
+    # an Arrow filter on the converted table, not a second from_pandas
+    table = pa.Table.from_pandas(df_out, preserve_index=False)
 
-    df_out.to_parquet(OUTPUT_PREDICTIONS, index=False)
+    sort_keys = [(c, "ascending") for c in SORT_KEYS if c in table.column_names]
+    table = table.take(_sort_indices(table, sort_keys))
+    sorting_columns = pq.SortingColumn.from_ordering(table.schema, sort_keys)
 
-    # alerts = df_out[df_out["alert_msg"].notna() & (df_out["alert_msg"] != "")]
-    # alerts.to_parquet(OUTPUT_ALERTS, index=False)
-
-    alerts = df_out[df_out["signal_count"] > 0]
-
-    alerts.to_parquet(OUTPUT_ALERTS, index=False)
+    _write_table_atomic(table, OUTPUT_PREDICTIONS, sorting_columns)
+    _write_table_atomic(
+        table.filter(table["has_signal"]), OUTPUT_ALERTS, sorting_columns,
+    )
     
     pbar.update(1)
     pbar.close()
 
+    # key last, and only for a clean run: rows whose LLM call failed
+    # must be retried by the next refresh, not skipped
+    llm_failed = (
+        "llm_summary" in df_out.columns
+        and (df_out["llm_summary"] == "LLM error.").any()
+    )
+    if not llm_failed:
+        OUTPUT_KEY.write_text(run_key)
+
     print("\n==============================")
     print("✅ DAILY REFRESH COMPLETE")
     print("==============================")
@@ -5,11 +5,12 @@ from __future__ import annotations
 import argparse
 import os
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
 
 import pandas as pd
 
 from core.n2_2_meta_ingestion import fetch_meta_daily_fact_table
+from core.parquet_io import PARQUET_WRITE_OPTIONS
 
 # =============================
 # CONFIG
@@ -53,13 +54,14 @@ def run_meta_ingestion(
     if df_meta.empty:
         raise RuntimeError("Meta ingestion returned empty DataFrame.")
     
-    df_meta.to_parquet(OUTPUT_META, index=False)
+    df_meta.to_parquet(OUTPUT_META, index=False, **PARQUET_WRITE_OPTIONS)
 
     info = {
         "rows": len(df_meta),
         "date_since": date_since,
         "date_until": date_until,
-        "generated_at": datetime.utcnow().isoformat(),
+        # "generated_at": datetime.utcnow().isoformat(),  # deprecated
+        "generated_at": datetime.now(timezone.utc).isoformat(),
     }
 
     pd.Series(info).to_json(OUTPUT_META_INFO)
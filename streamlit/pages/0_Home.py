@@ -1,14 +1,29 @@
 from __future__ import annotations
 
 import pandas as pd
+import numpy as np
 import streamlit as st
 from pathlib import Path
 
+from utils.data import load_predictions
+
 # =========================================
 # CONFIG
 # =========================================
 DATA_PATH = Path("data/predictions/predictions.parquet")
 
+# columns this page reads (parquet projection)
+COLS = (
+    "client",
+    "campaign_id",
+    "campaign_name",
+    "ctr_drop_flag",
+    "spend_spike_flag",
+    "retargeting_pool",
+    "ctr_link",
+    "pred_ctr_link",
+)
+
 st.set_page_config(
     page_title="Home Page",
     layout="wide",
@@ -26,12 +41,15 @@ if not DATA_PATH.exists():
     st.error("No prediction data found. Run Daily Refresh first.")
     st.stop()
 
-df = pd.read_parquet(DATA_PATH)
+# df = pd.read_parquet(DATA_PATH)
+mtime = DATA_PATH.stat().st_mtime
+df = load_predictions(str(DATA_PATH), mtime, COLS)
 
 # ========================================
 # REQUIRED COLUMNS CHECK
 # ========================================
 required_cols = {
+    "client",
     "campaign_id",
     "campaign_name",
     "ctr_drop_flag",
@@ -49,53 +67,68 @@ if missing:
 # ========================================
 # CLIENT-LEVEL AGGREGATION
 # ========================================
-client_df = (
-    df
-    .groupby("client")
-    .agg(
-        campaigns=("campaign_id", "nunique"),
-        ctr_drops=("ctr_drop_flag", "sum"),
-        spend_spikes=("spend_spike_flag", "sum"),
-        avg_ctr_link=("ctr_link", "mean"),
-        avg_pred_ctr_link=("pred_ctr_link", "mean"),
-        retargeting_campaigns=("retargeting_pool", "max"),
+@st.cache_data(show_spinner=False)
+def client_summary(path: str, mtime: float) -> pd.DataFrame:
+    """
+    One row per client, computed once per predictions file version
+    rather than on every rerun.
+    """
+    df = load_predictions(path, mtime, COLS)
+
+    return (
+        df
+        .groupby("client", observed=True)
+        .agg(
+            campaigns=("campaign_id", "nunique"),
+            ctr_drops=("ctr_drop_flag", "sum"),
+            spend_spikes=("spend_spike_flag", "sum"),
+            avg_ctr_link=("ctr_link", "mean"),
+            avg_pred_ctr_link=("pred_ctr_link", "mean"),
+            retargeting_campaigns=("retargeting_pool", "max"),
+        )
+        .reset_index()
     )
-    .reset_index()
-)
+
+client_df = client_summary(str(DATA_PATH), mtime)
 
 # ==========================
 # DERIVED SIGNALS
 # ==========================
-def classify_retargeting(pool):
-    if pool >= 5000:
-        return "High"
-    if pool >= 1500:
-        return "Medium"
-    return "Low"
-
-def classify_fatigue(row):
-    ratio = row["ctr_drops"] / max(row["campaigns"], 1)
-    if ratio >= 0.3:
-        return "High"
-    if ratio > 0:
-        return "Medium"
-    return "Low"
-
-def classify_status(row):
-    if row["ctr_drops"] / max(row["campaigns"], 1) >= 0.3:
-        return "Critical"
-    if row["ctr_drops"] > 0 or row["spend_spikes"] > 0:
-        return "At Risk"
-    return "Healthy"
-
-client_df["Retargeting Depth"] = client_df["retargeting_pool"].apply(classify_retargeting)
-client_df["Creative Fatigue"] = client_df.apply(classify_fatigue, axis=1)
-client_df["Status"] = client_df.appl(classify_status, axis=1)
+# whole-column np.select instead of a Python call per client row
+pool = client_df["retargeting_campaigns"].to_numpy()
+drops = client_df["ctr_drops"].to_numpy()
+spikes = client_df["spend_spikes"].to_numpy()
+
+# drop ratio divided once, shared by fatigue and status
+ratio = drops / np.maximum(client_df["campaigns"].to_numpy(), 1)
+critical = ratio >= 0.3
+
+client_df["Retargeting Depth"] = np.select(
+    [pool >= 5000, pool >= 1500],
+    ["High", "Medium"],
+    default="Low",
+)
+
+client_df["Creative Fatigue"] = np.select(
+    [critical, ratio > 0],
+    ["High", "Medium"],
+    default="Low",
+)
+
+at_risk = ~critical & ((drops > 0) | (spikes > 0))
+client_df["Status"] = np.where(
+    critical,
+    "Critical",
+    np.where(at_risk, "At Risk", "Healthy"),
+)
 
 # CTR Trend Proxy
-client_df["CTR Trend"] = (
-    client_df["avg_ctr"] - client_df["avg_pred_ctr"]
-).apply(lambda x: "↗" if x > 0.001 else "↘" if x < -0.001 else "→")
+delta = (client_df["avg_ctr_link"] - client_df["avg_pred_ctr_link"]).to_numpy()
+client_df["CTR Trend"] = np.select(
+    [delta > 1e-3, delta < -1e-3],
+    ["↗", "↘"],
+    default="→",
+)
 
 # CPA Trend placeholder (future)
 client_df["CPA Trend"] = "→"
@@ -105,7 +138,7 @@ client_df["CPA Trend"] = "→"
 # ========================================
 display_df = client_df[
     [
-        "Campaign",
+        "client",
         "CTR Trend",
         "CPA Trend",
         "Retargeting Depth",
@@ -114,21 +147,22 @@ display_df = client_df[
     ]
 ].rename(columns={"client": "Client"})
 
-def highlight_status(val):
-    if val == "Critical":
-        return "background-color:#ffcccc;font-weight:bold"
-    if val == "At Risk":
-        return "background-color:#fff2cc"
-    if val == "Healthy":
-        return "background-color:#e6ffea"
-    return ""
+STATUS_CSS = {
+    "Critical": "background-color:#ffcccc;font-weight:bold",
+    "At Risk": "background-color:#fff2cc",
+    "Healthy": "background-color:#e6ffea",
+}
+
+def highlight_status(col: pd.Series) -> pd.Series:
+    # one dict lookup over the whole column, not a call per cell
+    return col.map(STATUS_CSS).fillna("")
 
 st.subheader("📋 Account Health Summary")
 
 st.dataframe(
     display_df
     .style
-    .applymap(highlight_status, subset=["Status"]),
+    .apply(highlight_status, subset=["Status"]),
     use_container_width=True,
 )
 
@@ -137,19 +171,22 @@ st.dataframe(
 # ========================================================
 col1, col2, col3 = st.columns(3)
 
+# one counting pass over Status instead of three comparisons
+status_counts = display_df["Status"].value_counts()
+
 col1.metric(
     "Healthy",
-    (display_df["Status"] == "Healthy").sum(),
+    int(status_counts.get("Healthy", 0)),
 )
 
 col2.metric(
     "At Risk",
-    (display_df["Status"] == "At Risk").sum(),
+    int(status_counts.get("At Risk", 0)),
 )
 
 col3.metric(
     "Critical",
-    (display_df["Status"] == "Critical").sum(),
+    int(status_counts.get("Critical", 0)),
 )
 
 st.caption("Health is derived from CTR drops, spend anomalies, and retargeting depth.")
\ No newline at end of file
@@ -12,6 +12,19 @@ import streamlit as st
 # =========================================
 PREDICTIONS_PATH = Path("data/predictions/predictions.parquet")
 
+# columns this page reads (parquet projection)
+COLS = (
+    "date",
+    "spend",
+    "impressions",
+    "clicks",
+    "ctr_link",
+    "pred_ctr_link",
+    "campaign_name",
+    "objective",
+    "campaign_activity_status",
+)
+
 DEFAULT_REFRESH_DAYS = 7
 REFRESH_COOLDOWN_MINUTES = 10
 
@@ -19,6 +32,8 @@ REFRESH_COOLDOWN_MINUTES = 10
 # PIPELINE IMPORT (SAFE)
 # =========================================
 from pipelines.file2_n4_daily_refresh import run_daily_refresh
+from utils.agg import by_date
+from utils.data import column_values, date_bounds, load_predictions_between
 
 # =========================================
 # PAGE SETUP
@@ -71,13 +86,12 @@ if not PREDICTIONS_PATH.exists():
     st.warning("No prediction data found. Please run the pipeline to generate predictions.")
     st.stop()
 
-df = pd.read_parquet(PREDICTIONS_PATH)
-
-# ==================================================
-# BASIC SANITY
-# ==================================================
-df["date"] = pd.to_datetime(df["date"])
-
+# df = pd.read_parquet(PREDICTIONS_PATH)
+# df = load_predictions(str(PREDICTIONS_PATH), PREDICTIONS_PATH.stat().st_mtime, COLS)
+# the date range is pushed into the parquet scan below; only the
+# bounds are needed up front for the picker
+mtime = PREDICTIONS_PATH.stat().st_mtime
+date_min, date_max = date_bounds(str(PREDICTIONS_PATH), mtime)
 
 # ==================================================
 # FILTERS
@@ -88,32 +102,43 @@ with st.expander("🔍 Filters", expanded=True):
     with col1:
         date_range = st.date_input(
             "Date range",
-            [df["date"].min().date(), df["date"].max().date()],
-        )
-
-    with col2:
-        campaigns = st.multiselect(
-            "Campaign",
-            sorted(df["campaign_name"].dropna().unique()),
-        )
-
-    with col3:
-        objectives = st.multiselect(
-            "Objective",
-            sorted(df["objective"].dropna().unique())
-            if "objective" in df.columns
-            else [],
+            [date_min.date(), date_max.date()],
         )
 
-    with col4:
-        status = st.multiselect(
-            "Status",
-            ["ACTIVE", "PASSIVE"],
-            default=["ACTIVE"],
-        )
+df = load_predictions_between(
+    str(PREDICTIONS_PATH),
+    mtime,
+    pd.Timestamp(date_range[0]),
+    pd.Timestamp(date_range[1]),
+    COLS,
+)
 
-# Apply filters
-mask = (df["date"].dt.date >= date_range[0]) & (df["date"].dt.date <= date_range[1])
+# df["date"] = pd.to_datetime(df["date"])  # loader returns datetime64 already
+
+# options span the whole file (cached per file version), so picks
+# survive a change of date range
+with col2:
+    campaigns = st.multiselect(
+        "Campaign",
+        column_values(str(PREDICTIONS_PATH), mtime, "campaign_name"),
+    )
+
+with col3:
+    objectives = st.multiselect(
+        "Objective",
+        column_values(str(PREDICTIONS_PATH), mtime, "objective"),
+    )
+
+with col4:
+    status = st.multiselect(
+        "Status",
+        ["ACTIVE", "PASSIVE"],
+        default=["ACTIVE"],
+    )
+
+# Apply filters (date range already applied by the scan)
+# mask = (df["date"].dt.date >= date_range[0]) & (df["date"].dt.date <= date_range[1])
+mask = pd.Series(True, index=df.index)
 
 if campaigns:
     mask &= df["campaign_name"].isin(campaigns)
@@ -133,9 +158,11 @@ st.subheader("📊Key Metrics")
 
 col1, col2, col3, col4 = st.columns(4)
 
-col1.metric("Spend", f"{df_filt['spend'].sum():,.2f}")
-col2.metric("Impressions", f"{int(df_filt['impressions'].sum()):,}")
-col3.metric("Clicks", f"{int(df_filt['clicks'].sum()):,}")
+totals = df_filt[["spend", "impressions", "clicks"]].sum()
+
+col1.metric("Spend", f"{totals['spend']:,.2f}")
+col2.metric("Impressions", f"{int(totals['impressions']):,}")
+col3.metric("Clicks", f"{int(totals['clicks']):,}")
 col4.metric("CTR (Link)", f"{df_filt['ctr_link'].mean():.2%}")
 
 # ==================================================
@@ -143,15 +170,16 @@ col4.metric("CTR (Link)", f"{df_filt['ctr_link'].mean():.2%}")
 # ==================================================
 st.subheader("📈 CTR (Link) vs Predicted CTR Over Time")
 
-ctr_ts = (
-    df_filt
-    .groupby("date")[["ctr_link", "pred_ctr_link"]]
-    .mean()
-    .reset_index()
-)
+# ctr_ts = (
+#     df_filt
+#     .groupby("date", observed=True)[["ctr_link", "pred_ctr_link"]]
+#     .mean()
+#     .reset_index()
+# )
+ctr_ts = by_date(df_filt, means=("ctr_link", "pred_ctr_link"))
 
 st.line_chart(
-    ctr_ts.set_index("date"),
+    ctr_ts,
 )
 
 # ==================================================
@@ -167,6 +195,6 @@ st.scatter_chart(
 # FOOTER
 # ===================================================
 st.caption(
-    f"Last updated: {df['date'].max().strftime('%Y-%m-%d')} · "
+    f"Last updated: {date_max.strftime('%Y-%m-%d')} · "
     "Data refresh is limited to last 7 days"
 )
\ No newline at end of file
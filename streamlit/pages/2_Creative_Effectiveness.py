@@ -1,14 +1,30 @@
 from __future__ import annotations
 
 import pandas as pd
+import numpy as np
 import streamlit as st
 from pathlib import Path
 
+from utils.data import column_values, load_predictions_where, widget_options
+
 # =========================================
 # CONFIG
 # =========================================
 DATA_PATH = Path("data/predictions/predictions.parquet")
 
+# columns this page reads (parquet projection)
+COLS = (
+    "date",
+    "client",
+    "campaign_id",
+    "campaign_name",
+    "ctr_link",
+    "ctr_link_roll_7",
+    "pred_ctr_link",
+    "ctr_drop_flag",
+    "impressions",
+)
+
 st.set_page_config(
     page_title="Creative Effectiveness",
     layout="wide",
@@ -24,7 +40,15 @@ if not DATA_PATH.exists():
     st.error("Prediction data not found. Run Daily Refresh first.")
     st.stop()
 
-df = pd.read_parquet(DATA_PATH)
+# the client pick is pushed into the parquet scan: only its rows are read
+mtime = DATA_PATH.stat().st_mtime
+
+st.sidebar.header("Filters")
+
+clients = column_values(str(DATA_PATH), mtime, "client")
+client_sel = st.sidebar.selectbox("Client", clients)
+
+df = load_predictions_where(str(DATA_PATH), mtime, (("client", client_sel),), COLS)
 
 # ========================================
 # VALIDATION
@@ -46,18 +70,9 @@ if missing:
     st.error(f"Missing required columns: {missing}")
     st.stop()
 
-df["date"] = pd.to_datetime(df["date"])
-
 # ========================================
 # FILTERS
 # ========================================
-st.sidebar.header("Filters")
-
-clients = sorted(df["client"].dropna().unique())
-client_sel = st.sidebar.selectbox("Client", clients)
-
-df = df[df["client"] == client_sel]
-
 date_min, date_max = df["date"].min(), df["date"].max()
 date_range = st.sidebar.date_input(
     "Date range",
@@ -71,7 +86,7 @@ df = df[
     (df["date"] <= pd.to_datetime(date_range[1]))
 ]
 
-campaigns = sorted(df["campaign_name"].unique())
+campaigns = widget_options(df["campaign_name"])
 campaign_sel = st.sidebar.selectbox("Campaign", ["All"] + campaigns)
 
 if campaign_sel != "All":
@@ -113,7 +128,7 @@ st.subheader(" Creative Fatigue Risk")
 
 table_df = (
     df
-    .groupby(["campaign_id", "campaign_name"])
+    .groupby(["campaign_id", "campaign_name"], observed=True)
     .agg(
         ctr=("ctr_link", "mean"),
         ctr_7d=("ctr_link_roll_7", "mean"),
@@ -126,10 +141,11 @@ table_df = (
 
 table_df["ctr_delta"] = table_df["ctr"] - table_df["pred_ctr"]
 
-def highlight_fatigue(val):
-    if val == 1:
-        return "background-color: #ffcccc;font-weight:bold"
-    return ""
+FATIGUE_CSS = "background-color: #ffcccc;font-weight:bold"
+
+def highlight_fatigue(col: pd.Series) -> np.ndarray:
+    # whole column at once, not a call per cell
+    return np.where(col.to_numpy() == 1, FATIGUE_CSS, "")
 
 st.dataframe(
     table_df[
@@ -153,7 +169,7 @@ st.dataframe(
         "fatigue_flag": "Creative Fatigue Risk",
     })
     .style
-    .applymap(highlight_fatigue, subset=["Fatigue Risk"]),
+    .apply(highlight_fatigue, subset=["Creative Fatigue Risk"]),
     use_container_width=True,
 )
 
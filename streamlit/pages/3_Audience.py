@@ -4,10 +4,23 @@ import pandas as pd
 import streamlit as st
 from pathlib import Path
 
+from utils.data import column_values, load_predictions_where, widget_options
+
 # =========================================
 # CONFIG
 # =========================================
 DATA_PATH = Path("data/predictions/predictions.parquet")
+
+# columns this page reads (parquet projection)
+COLS = (
+    "date",
+    "client",
+    "campaign_id",
+    "campaign_name",
+    "objective",
+    "retargeting_pool",
+)
+
 RETARGETING_THRESHOLD = 2500
 
 st.set_page_config(
@@ -25,7 +38,15 @@ if not DATA_PATH.exists():
     st.error("Feature data not found. Run training or daily refresh first.")
     st.stop()
 
-df = pd.read_parquet(DATA_PATH)
+# the client pick is pushed into the parquet scan: only its rows are read
+mtime = DATA_PATH.stat().st_mtime
+
+st.sidebar.header("Filters")
+
+clients = column_values(str(DATA_PATH), mtime, "client")
+client_sel = st.sidebar.selectbox("Client", clients)
+
+df = load_predictions_where(str(DATA_PATH), mtime, (("client", client_sel),), COLS)
 
 # ========================================
 # VALIDATION
@@ -44,19 +65,10 @@ if missing:
     st.error(f"Missing required columns: {missing}")
     st.stop()
 
-df["date"] = pd.to_datetime(df["date"])
-
 # ========================================
 # FILTERS
 # ========================================
-st.sidebar.header("Filters")
-
-clients = sorted(df["client"].dropna().unique())
-client_sel = st.sidebar.selectbox("Client", clients)
-
-df = df[df["client"] == client_sel]
-
-objectives = sorted(df["objective"].dropna().unique())
+objectives = widget_options(df["objective"])
 objective_sel = st.sidebar.multiselect(
     "Objective",
     objectives,
@@ -65,7 +77,7 @@ objective_sel = st.sidebar.multiselect(
 
 df = df[df["objective"].isin(objective_sel)]
 
-campaigns = sorted(df["campaign_name"].unique())
+campaigns = widget_options(df["campaign_name"])
 campaign_sel = st.sidebar.selectbox("Campaign", campaigns)
 
 df_campaign = df[df["campaign_name"] == campaign_sel]
@@ -121,7 +133,7 @@ st.subheader("📊 Retargeting Pool by Campaign (Latest)")
 
 latest_df = (
     df.sort_values("date")
-    .groupby(["campaign_id", "campaign_name"], as_index=False)
+    .groupby(["campaign_id", "campaign_name"], as_index=False, observed=True)
     .last()
 )
 
@@ -4,11 +4,27 @@ import pandas as pd
 import streamlit as st
 from pathlib import Path
 
+from utils.agg import by_date
+from utils.data import load_predictions, widget_options
+
 # =========================================
 # CONFIG
 # =========================================
 DATA_PATH = Path("data/predictions/predictions.parquet")
 
+# columns this page reads (parquet projection)
+COLS = (
+    "date",
+    "campaign_id",
+    "campaign_name",
+    "objective",
+    "spend",
+    "result_value",
+    "cost_per_result",
+    "result_type",
+    "result_category",
+)
+
 st.set_page_config(
     page_title="Offer & Conversion Insights",
     layout="wide",
@@ -24,7 +40,7 @@ if not DATA_PATH.exists():
     st.error("Canonical dataset not found. Run canonical build first.")
     st.stop()
 
-df = pd.read_parquet(DATA_PATH)
+df = load_predictions(str(DATA_PATH), DATA_PATH.stat().st_mtime, COLS)
 
 # =========================================
 # VALIDATION
@@ -46,8 +62,6 @@ if missing:
     st.error(f"Missing required columns: {missing}")
     st.stop()
 
-df["date"] = pd.to_datetime(df["date"])
-
 # =========================================
 # SIDEBAR FILTERS
 # =========================================
@@ -57,7 +71,7 @@ st.sidebar.header("Filters")
 # client_sel = st.sidebar.selectbox("Client", clients)
 # df = df[df["client"] == client_sel]
 
-objectives = sorted(df["objective"].dropna().unique())
+objectives = widget_options(df["objective"])
 objective_sel = st.sidebar.multiselect(
     "Objective",
     objectives,
@@ -66,12 +80,12 @@ objective_sel = st.sidebar.multiselect(
 
 df = df[df["objective"].isin(objective_sel)]
 
-campaigns = sorted(df["campaign_name"].dropna().unique())
+campaigns = widget_options(df["campaign_name"])
 campaign_sel = st.sidebar.selectbox("Campaign", ["All"] + campaigns)
 if campaign_sel != "All":
     df = df[df["campaign_name"] == campaign_sel]
 
-categories = sorted(df["result_category"].dropna().unique())
+categories = widget_options(df["result_category"])
 category_sel = st.sidebar.multiselect(
     "Result Category",
     categories,
@@ -116,12 +130,7 @@ st.divider()
 # =======================================
 st.subheader("📉 Cost per Result Trend")
 
-trend_df = (
-    df.groupby("date", as_index=False)
-    .agg(cost_per_result=("cost_per_result", "mean"))
-    .sort_values("date")
-    .set_index("date")
-)
+trend_df = by_date(df, means=("cost_per_result",))
 
 st.line_chart(trend_df)
 
@@ -131,13 +140,8 @@ st.line_chart(trend_df)
 st.subheader("💸 Spend vs Conversions")
 
 sv_df = (
-    df.groupby("date", as_index=False)
-    .agg(
-        spend=("spend", "sum"),
-        conversions=("result_value", "sum"),
-    )
-    .sort_values("date")
-    .set_index("date")
+    by_date(df, sums=("spend", "result_value"))
+    .rename(columns={"result_value": "conversions"})
 )
 
 st.line_chart(sv_df)
@@ -148,7 +152,7 @@ st.line_chart(sv_df)
 st.subheader("📈 Conversions Mix by Category")
 
 mix_df = (
-    df.groupby("result_category", as_index=False)
+    df.groupby("result_category", as_index=False, observed=True)
     .agg(result_value=("result_value", "sum"))
     .sort_values("result_value", ascending=False)
 )
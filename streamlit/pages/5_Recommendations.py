@@ -1,14 +1,47 @@
 from __future__ import annotations
 
+import html
+
 import pandas as pd
+import numpy as np
 import streamlit as st
 from pathlib import Path
 
+from utils.data import column_values, date_bounds, load_predictions_where
+
 # =========================================
 # CONFIG
 # =========================================
 DATA_PATH = Path("data/predictions/predictions.parquet")
 
+CARD_HTML = (
+    "<div style='border:1px solid rgba(49,51,63,0.2);border-radius:0.5rem;"
+    "padding:1rem;margin-bottom:1rem;display:flex;gap:1.5rem'>"
+    "<div style='font-size:2.5rem;min-width:3rem;text-align:center'>{icon}</div>"
+    "<div>"
+    "<h3>{name}</h3>"
+    "<p><b>Status:</b> {status}</p>"
+    "<p><b>Summary</b>: {summary}</p>"
+    "<p><b>Reason</b>: {reason}</p>"
+    "<p><b>Recommend Action:</b> {action}</p>"
+    "</div>"
+    "</div>"
+)
+
+# columns this page reads (parquet projection)
+COLS = (
+    "date",
+    "client",
+    "campaign_name",
+    "ctr_drop_flag",
+    "spend_spike_flag",
+    "retargeting_pool_large",
+    "reason",
+    "action",
+    "summary",
+    "alert_msg",
+)
+
 st.set_page_config(
     page_title="Action Recommendations",
     layout="wide",
@@ -24,7 +57,22 @@ if not DATA_PATH.exists():
     st.error("No prediction data found. Run daily refresh first.")
     st.stop()
 
-df = pd.read_parquet(DATA_PATH)
+# client and latest date are pushed into the parquet scan: only the
+# rows shown below are read
+mtime = DATA_PATH.stat().st_mtime
+_, latest_date = date_bounds(str(DATA_PATH), mtime)
+
+st.sidebar.header("Filters")
+
+clients = column_values(str(DATA_PATH), mtime, "client")
+client_sel = st.sidebar.selectbox("Client", clients)
+
+df = load_predictions_where(
+    str(DATA_PATH),
+    mtime,
+    (("client", client_sel), ("date", latest_date)),
+    COLS,
+)
 
 # =========================================
 # VALIDATION
@@ -46,21 +94,9 @@ if missing:
     st.error(f"Missing required columns: {missing}")
     st.stop()
 
-# Use latest date only
-df["date"] = pd.to_datetime(df["date"])
-latest_date = df["date"].max()
-df = df[df["date"] == latest_date]
-
 # ========================================
 # FILTERS
 # ========================================
-st.sidebar.header("Filters")
-
-clients = sorted(df["client"].dropna().unique())
-client_sel = st.sidebar.selectbox("Client", clients)
-
-df = df[df["client"] == client_sel]
-
 issues_only = st.sidebar.checkbox(
     "Show only campaigns with issues",
     value=True,
@@ -76,27 +112,28 @@ if issues_only:
 # ========================================
 # PRIORITY SORTING (DISPLAY ONLY)
 # ========================================
-def priority_score(row) -> int:
-    if row["ctr_drop_flag"] == 1:
-        return 1
-    if row["spend_spike_flag"] == 1:
-        return 2
-    if row["retargeting_pool_large"] == 1:
-        return 3
-    return 4
-
-df["priority"] = df.apply(priority_score, axis=1)
+# first matching flag wins: ctr drop > spend spike > retargeting pool
+df["priority"] = np.select(
+    [
+        df["ctr_drop_flag"] == 1,
+        df["spend_spike_flag"] == 1,
+        df["retargeting_pool_large"] == 1,
+    ],
+    [1, 2, 3],
+    default=4,
+)
 df = df.sort_values("priority")
 
 # ========================================
 # STATUS RENDERING
 # ========================================
-def render_status(row) -> tuple[str: str]:
-    if row["ctr_drop_flag"] == 1 or row["spend_spike_flag"] == 1:
-        return "⚠", "At Risk"
-    if row["retargeting_pool_large"] == 1:
-        return "ℹ", "Opportunity"
-    return "✅", "Healthy"
+# classified once over the flag columns, not per card
+status_cond = [
+    (df["ctr_drop_flag"] == 1) | (df["spend_spike_flag"] == 1),
+    df["retargeting_pool_large"] == 1,
+]
+df["status_icon"] = np.select(status_cond, ["⚠", "ℹ"], default="✅")
+df["status_label"] = np.select(status_cond, ["At Risk", "Opportunity"], default="Healthy")
 
 # ========================================
 # ALERT CARDS
@@ -105,28 +142,42 @@ if df.empty:
     st.success("✅ All campaigns are healthy today.")
     st.stop()
 
-for _, row in df.iterrows():
-    icon, status = render_status(row)
-
-    with st.container(border=True):
-        c1, c2 = st.columns([1, 6])
-
-        with c1:
-            st.markdown(
-                f"<h1 style='text-align:center'>{icon}</h1>",
-                unsafe_allow_html=True,
-            )
-        
-        with c2:
-            st.markdown(f"### {row['campaign_name']}")
-            st.markdown(f"**Status:** {status}")
-            st.markdown(f"**Summary**: {row['summary']}")
-            st.markdown(f"**Reason**: {row['reason']}")
-            st.markdown(f"**Recommend Action:** {row['action']}")
-
-            if row["alert_msg"]:
-                with st.expander("📣 Alert message (WhatsApp-ready)"):
-                    st.code(row["alert_msg"])
+def _text(value) -> str:
+    # escaped, single-line HTML: a blank line would end the markdown HTML block
+    return html.escape(str(value)).replace("\n", "<br>")
+
+# consecutive cards go out as ONE markdown element instead of ~8 Streamlit
+# calls each; the run is cut after a card with an alert message so its
+# expander (interactive, copyable code block) still sits right under it
+pending: list[str] = []
+for icon, status, name, summary, reason, action, msg in zip(
+    df["status_icon"].to_numpy(),
+    df["status_label"].to_numpy(),
+    df["campaign_name"].to_numpy(),
+    df["summary"].to_numpy(),
+    df["reason"].to_numpy(),
+    df["action"].to_numpy(),
+    df["alert_msg"].to_numpy(),
+):
+    pending.append(
+        CARD_HTML.format(
+            icon=icon,
+            name=_text(name),
+            status=status,
+            summary=_text(summary),
+            reason=_text(reason),
+            action=_text(action),
+        )
+    )
+
+    if isinstance(msg, str) and msg:
+        st.markdown("".join(pending), unsafe_allow_html=True)
+        pending.clear()
+        with st.expander("📣 Alert message (WhatsApp-ready)"):
+            st.code(msg)
+
+if pending:
+    st.markdown("".join(pending), unsafe_allow_html=True)
 
 # ========================================
 # FOOTER
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import pandas as pd
+import numpy as np
+
+
+# =========================================
+# DAILY AGGREGATES
+# =========================================
+def by_date(
+    df: pd.DataFrame,
+    *,
+    sums: tuple[str, ...] = (),
+    means: tuple[str, ...] = (),
+) -> pd.DataFrame:
+    """
+    Per-date sums / means, indexed by sorted date.
+
+    Same result as df.groupby("date")[cols].sum() / .mean() (NaN values
+    skipped, NaT dates dropped), done as np.bincount over factorized
+    dates: one C loop per column instead of a groupby per chart.
+    """
+    codes, dates = pd.factorize(df["date"], sort=True)
+    keep = codes >= 0
+    codes = codes[keep]
+    n = len(dates)
+
+    out = {}
+    for col in (*sums, *means):
+        values = df[col].to_numpy(dtype=np.float64)[keep]
+        present = ~np.isnan(values)
+        total = np.bincount(codes, weights=np.where(present, values, 0.0), minlength=n)
+
+        if col in means:
+            count = np.bincount(codes, weights=present, minlength=n)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                total = total / count
+
+        out[col] = total
+
+    return pd.DataFrame(out, index=pd.Index(dates, name="date"))
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import streamlit as st
+
+# =========================================
+# CONFIG
+# =========================================
+# low-cardinality text keys: category codes group / filter / dedupe
+# on integers instead of hashing Python strings
+CATEGORY_COLS = ("client", "campaign_id", "campaign_name", "objective", "result_category")
+
+
+# =========================================
+# HELPERS
+# =========================================
+def _present(names: list[str], columns: tuple[str, ...] | None) -> list[str] | None:
+    """
+    Keep only requested columns that exist in the file, so the page's
+    own required-columns check reports the missing ones.
+    """
+    if columns is None:
+        return None
+    available = set(names)
+    return [c for c in columns if c in available]
+
+
+def _categorize(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast CATEGORY_COLS to category where present (dictionary-encoded
+    parquet columns already arrive as category).
+    """
+    cols = {
+        c: "category"
+        for c in CATEGORY_COLS
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype)
+    }
+    return df.astype(cols) if cols else df
+
+
+def _to_pandas(table: pa.Table) -> pd.DataFrame:
+    """
+    Arrow -> pandas; split_blocks skips block consolidation. No
+    self_destruct: the buffers belong to the shared table below.
+    Result keeps numpy / category dtypes, `date` as datetime64.
+    """
+    df = _categorize(table.to_pandas(split_blocks=True))
+
+    # the daily refresh writes timestamp[ns]; parse only older text dates
+    if "date" in df.columns and df["date"].dtype.kind != "M":
+        df["date"] = pd.to_datetime(df["date"])
+
+    return df
+
+
+def widget_options(s: pd.Series) -> list:
+    """
+    Sorted distinct non-null values of an (already filtered) column.
+
+    For category columns the distinct set comes from the integer codes,
+    so only the used categories are looked up and string-sorted.
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = np.unique(s.cat.codes.to_numpy())
+        return sorted(s.cat.categories[codes[codes >= 0]].tolist())
+    return sorted(s.dropna().unique())
+
+
+# =========================================
+# SHARED TABLE
+# =========================================
+@st.cache_resource(show_spinner=False, max_entries=1)
+def predictions_table(path: str, mtime: float) -> pa.Table:
+    """
+    The predictions parquet as one Arrow table per file version, held
+    once per process and shared (not copied) across pages and sessions.
+    A new `mtime` (daily refresh) replaces it.
+    """
+    return pq.read_table(path, memory_map=True, pre_buffer=True)
+
+
+def _scan(path: str, mtime: float, columns: tuple[str, ...] | None, filter) -> pd.DataFrame:
+    """
+    Projected, filtered slice of the shared table -> pandas.
+    """
+    table = predictions_table(path, mtime)
+    sliced = ds.dataset(table).to_table(
+        columns=_present(table.column_names, columns),
+        filter=filter,
+    )
+    return _to_pandas(sliced)
+
+
+# =========================================
+# CACHED LOADERS
+# =========================================
+@st.cache_data(show_spinner=False)
+def load_predictions(
+    path: str,
+    mtime: float,
+    columns: tuple[str, ...] | None = None,
+) -> pd.DataFrame:
+    """
+    Predictions frame once per file version.
+
+    `mtime` is only part of the cache key: a rerun (widget interaction)
+    reuses the converted frame, a new daily refresh invalidates it.
+    `columns` projects the conversion to what the page uses.
+    """
+    return _scan(path, mtime, columns, None)
+
+
+@st.cache_data(show_spinner=False)
+def date_bounds(path: str, mtime: float) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    Min / max of the `date` column.
+    """
+    bounds = pc.min_max(predictions_table(path, mtime).column("date")).as_py()
+    return pd.Timestamp(bounds["min"]), pd.Timestamp(bounds["max"])
+
+
+@st.cache_data(show_spinner=False)
+def load_predictions_between(
+    path: str,
+    mtime: float,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    columns: tuple[str, ...] | None = None,
+) -> pd.DataFrame:
+    """
+    Read rows with start <= date <= end.
+    """
+    date = ds.field("date")
+    return _scan(path, mtime, columns, (date >= start) & (date <= end))
+
+
+@st.cache_data(show_spinner=False)
+def load_predictions_where(
+    path: str,
+    mtime: float,
+    equals: tuple[tuple[str, object], ...],
+    columns: tuple[str, ...] | None = None,
+) -> pd.DataFrame:
+    """
+    Read rows matching every (column, value) pair in `equals`,
+    e.g. (("client", client_sel),).
+
+    Pairs on columns the file lacks are ignored, as is a None value.
+    """
+    names = set(predictions_table(path, mtime).column_names)
+
+    filter = None
+    for col, value in equals:
+        if col not in names or value is None:
+            continue
+        cond = ds.field(col) == value
+        filter = cond if filter is None else filter & cond
+
+    return _scan(path, mtime, columns, filter)
+
+
+@st.cache_data(show_spinner=False)
+def column_values(path: str, mtime: float, column: str) -> list:
+    """
+    Sorted distinct non-null values of one column ([] if absent),
+    for filter widgets.
+    """
+    table = predictions_table(path, mtime)
+    if column not in table.column_names:
+        return []
+
+    values = pc.unique(table.column(column))
+    return sorted(v for v in values.to_pylist() if v is not None)